@@ -2,10 +2,10 @@
 
 
 import math
-import random
 import signal
 import sys
-import time
+
+import numpy as np
 
 
 from which_pyqt import PYQT_VER
@@ -24,12 +24,31 @@ else:
 	raise Exception('Unsupported Version of PyQt: {}'.format(PYQT_VER))
 
 
+# Solver results and progress are posted back to the GUI thread
+if PYQT_VER == 'PYQT6':
+	QUEUED = Qt.ConnectionType.QueuedConnection
+	HORIZONTAL = Qt.Orientation.Horizontal
+	TRANSPARENT = Qt.GlobalColor.transparent
+	ROUND_CAP = Qt.PenCapStyle.RoundCap
+else:
+	QUEUED = Qt.QueuedConnection
+	HORIZONTAL = Qt.Horizontal
+	TRANSPARENT = Qt.transparent
+	ROUND_CAP = Qt.RoundCap
+
+# Points are drawn at most one per POINT_CELL x POINT_CELL pixel cell, so
+# drawing the point layer costs the same however dense the cloud is
+POINT_CELL = 2
+
+
 #TODO: Error checking on txt boxes
 #TODO: Color strings
 
 
 # Import the code with the actual implementation
 from convex_hull import *
+from hull_cache import HullCache
+from point_generator import generate_points
 # from convex_hull_complete_nonthread import *
 
 
@@ -45,6 +64,11 @@ class PointLineView( QWidget ):
 		self.lineList   = {}
 		self.status_bar = status_bar
 
+		# the same points as pointList, as Nx2 arrays, and the point layer
+		# rendered off-screen from them; None until the next paint
+		self.pointCoords = {}
+		self.pointCache  = None
+
 	def displayStatusText(self, text):
 		self.status_bar.showMessage(text)
 		self.update()
@@ -52,6 +76,8 @@ class PointLineView( QWidget ):
 
 	def clearPoints(self):
 		self.pointList = {}
+		self.pointCoords = {}
+		self.pointCache = None
 
 	def clearLines(self, lines=None):
 		if(not lines):
@@ -67,10 +93,14 @@ class PointLineView( QWidget ):
 		app.processEvents()					#Why is this necessary????
 
 	def addPoints( self, point_list, color ):
+		coords = np.array( [(point.x(), point.y()) for point in point_list], dtype=np.float64 ).reshape(-1, 2)
 		if color in self.pointList:
 			self.pointList[color].extend( point_list )
+			self.pointCoords[color] = np.concatenate( (self.pointCoords[color], coords) )
 		else:
 			self.pointList[color] = point_list
+			self.pointCoords[color] = coords
+		self.pointCache = None
 
 	def addLines( self, line_list, color ):
 		if color in self.lineList:
@@ -80,10 +110,12 @@ class PointLineView( QWidget ):
 		self.update()
 		app.processEvents()					#Why is this necessary????
 
-	def paintEvent(self, event):
-		painter = QPainter(self)
-		# painter.setRenderHint(QPainter.Antialiasing,True)
+	def resizeEvent(self, event):
+		self.pointCache = None
+		super(PointLineView,self).resizeEvent(event)
 
+	# half-width and half-height, in pixels, of the [-1,1] x [-1,1] drawing area
+	def viewScale(self):
 		w = self.width() / 2.0
 		h = self.height() / 2.0
 		w2h_desired_ratio = 1.5
@@ -91,30 +123,57 @@ class PointLineView( QWidget ):
 			h = w / w2h_desired_ratio
 		else:
 			w = h * w2h_desired_ratio
+		return w, h
+
+	# Draw the points into an off-screen pixmap, keeping one point for every
+	# POINT_CELL-sized pixel cell that has any, with one drawPoints per color
+	def renderPoints(self):
+		w, h = self.viewScale()
+		ratio = self.devicePixelRatioF()
+		self.pointCache = QPixmap( int(self.width()*ratio), int(self.height()*ratio) )
+		self.pointCache.setDevicePixelRatio(ratio)
+		self.pointCache.fill(TRANSPARENT)
+
+		columns = self.width() // POINT_CELL + 1
+		rows = self.height() // POINT_CELL + 1
+		painter = QPainter(self.pointCache)
+		for color in self.pointCoords:
+			coords = self.pointCoords[color]
+			cx = np.rint( (self.width()/2.0 + w*coords[:,0]) / POINT_CELL ).astype(np.int64)
+			cy = np.rint( (self.height()/2.0 - h*coords[:,1]) / POINT_CELL ).astype(np.int64)
+			visible = (cx >= 0) & (cx < columns) & (cy >= 0) & (cy < rows)
+			occupied = np.zeros( (columns, rows), dtype=bool )
+			occupied[cx[visible], cy[visible]] = True
+			cells = np.argwhere(occupied) * POINT_CELL
+
+			pen = QPen( QColor(color[0],color[1],color[2]) )
+			pen.setWidthF(3.0)
+			pen.setCapStyle(ROUND_CAP)
+			painter.setPen( pen )
+			painter.drawPoints( QPolygonF( [QPointF(x, y) for x, y in cells.tolist()] ) )
+		painter.end()
+
+	def paintEvent(self, event):
+		if self.pointCache is None:
+			self.renderPoints()
+
+		painter = QPainter(self)
+		# painter.setRenderHint(QPainter.Antialiasing,True)
+		painter.drawPixmap(0, 0, self.pointCache)
 
+		# the lines are drawn as they are, the transform does the scaling and
+		# a cosmetic pen keeps them one pixel wide
+		w, h = self.viewScale()
 		tform = QTransform()
 		tform.translate(self.width()/2.0,self.height()/2.0)
-		tform.scale(1.0,-1.0)
+		tform.scale(w,-h)
 		painter.setTransform(tform)
 
 		for color in self.lineList:
-			c = QColor(color[0],color[1],color[2])
-			painter.setPen( c )
-			for line in self.lineList[color]:
-				ln = QLineF( w*line.x1(), h*line.y1(), w*line.x2(), h*line.y2() )
-				painter.drawLine( ln )
-
-		for color in self.pointList:
-			c = QColor(color[0],color[1],color[2])
-			painter.setPen( c )
-			for point in self.pointList[color]:
-				pt = QPointF(w*point.x(), h*point.y())
-				painter.drawEllipse( pt, 1.0, 1.0)
-
-				# painter.scale(1.0, -1.0)
-				# textPoint = QPointF(w * point.x(), -h * point.y())
-				# painter.drawText(textPoint, str(round(point.x(), 3)) + "," + str(round(point.y(), 3)))
-				# painter.scale(1.0, -1.0)
+			pen = QPen( QColor(color[0],color[1],color[2]) )
+			pen.setCosmetic(True)
+			painter.setPen( pen )
+			painter.drawLines( self.lineList[color] )
 
 
 # Main GUI class
@@ -126,8 +185,21 @@ class Proj2GUI( QMainWindow ):
 # This is where the points for a problem instance are kept
 		self.points = None
 
+# The background solve, if one is running
+		self.solveThread = None
+		self.solveWorker = None
+
+# The "Show Recursion" animation, if one is playing
+		self.replay = None
+
+# Hulls already computed, so solving the same points again is a lookup
+		self.hullCache = HullCache()
+
+# x-order of the current points from the last solve, so solving them again skips the sort
+		self.pointOrder = None
+
 # Getting an instance of your solver
-		self.solver = ConvexHullSolver()
+		self.solver = ConvexHullSolver(cache=self.hullCache)
 
 # start the GUI
 		self.initUI()
@@ -138,51 +210,24 @@ class Proj2GUI( QMainWindow ):
 		# TODO - ERROR CHECKING!!!!
 		if self.randBySeed.isChecked():
 			seed = int(self.randSeed.text())
-			random.seed( seed )
 		else: # do by time
-			random.seed( time.time() )
+			seed = None
 
-		ptlist = []
-		unique_xvals = {}
-		max_r  = 0.98
-		WIDTH  = 1.0
-		HEIGHT = 1.0
-		npoints = int(self.npoints.text())
 		if self.distribOval.isChecked():
-			while len(ptlist) < npoints:
-				x = random.uniform(-1.0,1.0)
-				y = random.uniform(-1.0,1.0)
-				if x**2+y**2 <= max_r**2:
-					xval = WIDTH*x
-					yval = HEIGHT*y
-					if not xval in unique_xvals:
-						ptlist.append( QPointF(xval,yval) )
-						unique_xvals[xval] = 1      # dict/map with float keys?
+			distribution = 'uniform'
 		elif self.distribSphere.isChecked():
-			while len(ptlist) < npoints:
-				x = random.uniform(-1.0,1.0)
-				y = random.uniform(-1.0,1.0)
-				z = random.uniform(-1.0,1.0)
-				if x**2 + y**2 + z**2 <= max_r**2:
-					xval = WIDTH*x
-					yval = HEIGHT*y
-					if not xval in unique_xvals:
-						ptlist.append( QPointF(xval,yval) )
-						unique_xvals[xval] = 1
+			distribution = 'spherical'
 		elif self.distribGaussian.isChecked():
-			while len(ptlist) < npoints:
-				x = random.gauss(0.0,0.25)
-				y = random.gauss(0.0,0.25)
-				if x**2+y**2 <= max_r**2:
-					xval = WIDTH*x
-					yval = HEIGHT*y
-					if not xval in unique_xvals:
-						ptlist.append( QPointF(xval,yval) )
-						unique_xvals[xval] = 1
-		return ptlist
+			distribution = 'gaussian'
+
+		npoints = int(self.npoints.text())
+		# same arrays the benchmarks get for this seed, only wrapped in QPointF's here
+		coords = generate_points( distribution, npoints, seed )
+		return [ QPointF(x,y) for x, y in coords.tolist() ]
 
 # Methods that handle GUI events
 	def clearClicked(self):
+		self.stopReplay()
 		self.view.clearLines()
 		self.view.displayStatusText('')
 		self.solveButton.setEnabled(True)
@@ -190,10 +235,12 @@ class Proj2GUI( QMainWindow ):
 		app.processEvents()							#Why is this necessary?????
 
 	def generateClicked(self):
+		self.stopReplay()
 		if self.points:
 			self.view.clearPoints()
 			self.view.clearLines()
 		self.points = self.newPoints()
+		self.pointOrder = None
 		self.view.addPoints( self.points, (0,0,0) )
 		self.solveButton.setEnabled(True)
 		self.view.update()
@@ -209,11 +256,98 @@ class Proj2GUI( QMainWindow ):
 		self.solveButton.setEnabled(False)
 		self.view.update()
 		app.processEvents()							#Why is this necessary?????
-		self.solver.compute_hull(self.points,self.showRecursion.isChecked(),self.view)
+		self.stopReplay()
+
+		# solve on a background thread so the window stays responsive; with
+		# "Show Recursion" the solve records its merges to be replayed afterwards
+		self.solveThread = QThread()
+		self.solveWorker = HullWorker(list(self.points), record=self.showRecursion.isChecked(), cache=self.hullCache, order_hint=self.pointOrder)
+		self.solveWorker.moveToThread(self.solveThread)
+		self.solveThread.started.connect(self.solveWorker.run)
+		self.solveWorker.progress.connect(self.solveProgress, QUEUED)
+		self.solveWorker.solved.connect(self.solveFinished, QUEUED)
+		self.solveWorker.cancelled.connect(self.solveCancelled, QUEUED)
+		self.solveWorker.failed.connect(self.solveFailed, QUEUED)
+		self.cancelButton.setEnabled(True)
+		self.solveThread.start()
+
+	def cancelClicked(self):
+		if self.solveWorker:
+			self.solveWorker.cancel()
+		self.cancelButton.setEnabled(False)
+
+	def solveProgress(self, merges_done, merges_total, points_remaining):
+		self.statusBar.showMessage('Solving: {} of {} merges done, {} points remaining'.format(
+			merges_done, merges_total, points_remaining))
+
+	def solveFinished(self, hull, elapsed, events):
+		self.pointOrder = self.solveWorker.x_order
+		if events is None:
+			self.view.addLines(self.solver.getPolygonFromPoints(hull), GREEN)
+		else:
+			self.startReplay(hull, events)
+		self.view.displayStatusText('Time Elapsed (Convex Hull): {:3.3f} sec'.format(elapsed))
+		self.solveDone()
+
+	def startReplay(self, hull, events):
+		self.replay = HullReplay(self.points, events, hull, self.view, self.replayFps.value())
+		self.replaySlider.setRange(0, len(events))
+		self.replaySlider.setValue(0)
+		self.replay.position_changed.connect(self.replaySlider.setValue)
+		self.replay.finished.connect(self.replayFinished)
+		self.replaySlider.setEnabled(True)
+		self.skipButton.setEnabled(True)
+		self.replay.start()
+
+	def stopReplay(self):
+		if self.replay:
+			self.replay.stop()
+			self.replayFinished()
+
+	def replayFinished(self):
+		self.replay = None
+		self.replaySlider.setEnabled(False)
+		self.skipButton.setEnabled(False)
+
+	def skipClicked(self):
+		if self.replay:
+			self.replay.skip()
+
+	def replaySeek(self, position):
+		if self.replay:
+			self.replay.seek(position)
+
+	def replayFpsChanged(self, fps):
+		if self.replay:
+			self.replay.set_fps(fps)
+
+	def solveCancelled(self):
+		self.view.displayStatusText('Solve cancelled')
+		self.solveButton.setEnabled(True)
+		self.solveDone()
+
+	def solveFailed(self, message):
+		self.view.displayStatusText('Solve failed: {}'.format(message))
+		self.solveButton.setEnabled(True)
+		self.solveDone()
+
+	def solveDone(self):
+		self.solveThread.quit()
+		self.solveThread.wait()
+		self.solveThread = None
+		self.solveWorker = None
+		self.cancelButton.setEnabled(False)
 		self.generateButton.setEnabled(True)
 		self.clearButton.setEnabled(True)
 		self.view.update()
-		app.processEvents()							#Why is this necessary?????
+
+	# don't let a running solve outlive the window
+	def closeEvent(self, event):
+		if self.solveThread:
+			self.solveWorker.cancel()
+			self.solveThread.quit()
+			self.solveThread.wait()
+		super(Proj2GUI,self).closeEvent(event)
 
 	def _randbytime(self):
 		self.randSeed.setEnabled(False)
@@ -239,6 +373,7 @@ class Proj2GUI( QMainWindow ):
 		self.generateButton = QPushButton('Generate')
 		self.solveButton    = QPushButton('Solve')
 		self.clearButton    = QPushButton('Clear To Points')
+		self.cancelButton   = QPushButton('Cancel')
 		self.distribOval    = QRadioButton('Uniform')
 		self.distribSphere  = QRadioButton('Spherical')
 		self.distribGaussian= QRadioButton('Gaussian')
@@ -248,6 +383,9 @@ class Proj2GUI( QMainWindow ):
 		self.randSeed       = QLineEdit('0')
 
 		self.showRecursion	= QCheckBox('Show Recursion')
+		self.replayFps		= QSpinBox()
+		self.replaySlider	= QSlider(HORIZONTAL)
+		self.skipButton		= QPushButton('Skip')
 
 		h = QHBoxLayout()
 		h.addWidget( self.view )
@@ -259,6 +397,7 @@ class Proj2GUI( QMainWindow ):
 		h.addWidget( self.generateButton )
 		h.addWidget( self.solveButton )
 		h.addWidget( self.clearButton )
+		h.addWidget( self.cancelButton )
 		h.addStretch(1)
 		vbox.addLayout(h)
 
@@ -286,9 +425,27 @@ class Proj2GUI( QMainWindow ):
 		h.addWidget(self.showRecursion)
 		vbox.addLayout(h)
 
+		h = QHBoxLayout()
+		h.addWidget( QLabel( 'Replay: ' ) )
+		h.addWidget( self.replaySlider, 1 )
+		h.addWidget( QLabel( 'Events/sec: ' ) )
+		h.addWidget( self.replayFps )
+		h.addWidget( self.skipButton )
+		vbox.addLayout(h)
+
 		self.generateButton.clicked.connect(self.generateClicked)
 		self.solveButton.clicked.connect(self.solveClicked)
 		self.clearButton.clicked.connect(self.clearClicked)
+		self.cancelButton.clicked.connect(self.cancelClicked)
+		self.cancelButton.setEnabled(False)
+
+		self.replayFps.setRange(1, 1000)
+		self.replayFps.setValue(int(1.0 / PAUSE))
+		self.replayFps.valueChanged.connect(self.replayFpsChanged)
+		self.replaySlider.sliderMoved.connect(self.replaySeek)
+		self.replaySlider.setEnabled(False)
+		self.skipButton.clicked.connect(self.skipClicked)
+		self.skipButton.setEnabled(False)
 
 		self.randByTime.clicked.connect(self._randbytime)
 		self.randBySeed.clicked.connect(self._randbyseed)
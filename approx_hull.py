@@ -0,0 +1,149 @@
+from collections import namedtuple
+import math
+
+import numpy as np
+
+from hull_engine import HullEngine
+from hull_query import HullIndex
+
+#
+# Approximate hulls by direction sampling, for inputs too large to be worth an
+# exact hull.
+#
+# k directions are spread evenly around the circle, and for each of them only
+# the point extreme in that direction is kept.  The approximation is the hull
+# of those k points, so:
+#   - it lies inside the true hull, and its vertices are input points;
+#   - it has at most k vertices;
+#   - every point of the true hull is within (D / 2) * tan(pi / k) of it,
+#     where D is the diameter of the input.
+# The tolerance is that distance as a fraction of D, and k is the smallest
+# multiple of 4 meeting it, about pi / (2 * tolerance).  Including the axis
+# directions makes the bounding box exact, and its diagonal bounds D, so
+# error_bound() is a guaranteed absolute bound (up to the rounding of the
+# projections, which is far below it).
+#
+# Points are fed in chunks in one pass, and nothing but the k extremes is kept,
+# so memory doesn't depend on n.  A point inside the hull of the current
+# extremes can't be extreme in any direction, so every chunk is first culled
+# against it with a HullIndex, and only the few points outside are projected
+# onto all k directions.
+#
+
+# the approximate hull: vertices as input positions and as (x, y), clockwise
+# from the leftmost point, the number of directions, the number of points
+# seen and the absolute error bound
+ApproximateResult = namedtuple('ApproximateResult', 'indices vertices directions points error_bound')
+
+# points handled per step; the first step is projected in full
+CHUNK_POINTS = 1 << 16
+
+# largest number of projections held at once
+BLOCK_PROJECTIONS = 1 << 20
+
+
+# number of directions for a tolerance relative to the diameter: the smallest
+# multiple of 4 with tan(pi / k) / 2 <= tolerance
+def directions_for(tolerance):
+    if not tolerance > 0:
+        raise ValueError('The tolerance must be positive, got {}'.format(tolerance))
+    k = math.ceil(math.pi / math.atan(2 * tolerance))
+    return max(4, 4 * math.ceil(k / 4))
+
+
+class ApproximateHull:
+
+    # tolerance is the largest distance of the true hull from the
+    # approximation, as a fraction of the diameter of the input
+    def __init__(self, tolerance):
+        self.tolerance = tolerance
+        k = directions_for(tolerance)
+        angles = 2 * math.pi * np.arange(k) / k
+        self.cos = np.cos(angles)
+        self.sin = np.sin(angles)
+        # the axis directions exactly, so that the bounding box is exact
+        quarter = k // 4
+        self.cos[::quarter] = (1.0, 0.0, -1.0, 0.0)
+        self.sin[::quarter] = (0.0, 1.0, 0.0, -1.0)
+
+        # best projection, its point and its input position, per direction
+        self.values = np.full(k, -np.inf)
+        self.xs = np.zeros(k)
+        self.ys = np.zeros(k)
+        self.indices = np.full(k, -1, dtype=np.int64)
+        self.points = 0
+        self.index = None
+
+    def __len__(self):
+        return len(self.cos)
+
+    # Feed the next points of the stream; their input positions continue from
+    # the points already fed
+    def add(self, xs, ys):
+        xs = np.asarray(xs, dtype=np.float64)
+        ys = np.asarray(ys, dtype=np.float64)
+        if len(xs) != len(ys):
+            raise ValueError('xs and ys must have the same length')
+        for start in range(0, len(xs), CHUNK_POINTS):
+            self.add_chunk(xs[start:start + CHUNK_POINTS], ys[start:start + CHUNK_POINTS])
+
+    def add_chunk(self, xs, ys):
+        positions = np.arange(self.points, self.points + len(xs))
+        self.points += len(xs)
+        if self.index is not None:
+            outside = ~self.index.contains_many(xs, ys)
+            xs = xs[outside]
+            ys = ys[outside]
+            positions = positions[outside]
+        if len(xs) == 0:
+            return
+
+        k = len(self.cos)
+        directions = np.arange(k)
+        block = max(1, BLOCK_PROJECTIONS // k)
+        for start in range(0, len(xs), block):
+            x = xs[start:start + block]
+            y = ys[start:start + block]
+            projections = np.outer(x, self.cos) + np.outer(y, self.sin)
+            rows = projections.argmax(axis=0)
+            values = projections[rows, directions]
+            better = values > self.values
+            self.values[better] = values[better]
+            self.xs[better] = x[rows[better]]
+            self.ys[better] = y[rows[better]]
+            self.indices[better] = positions[start + rows[better]]
+
+        hull = self.hull()
+        self.index = HullIndex.from_engine(self.xs, self.ys, hull)
+
+    # positions in self.xs/ys of the hull of the extremes, clockwise from the
+    # leftmost point
+    def hull(self):
+        # neighbouring directions often share their extreme point
+        distinct = np.unique(self.indices, return_index=True)[1]
+        hull = HullEngine(self.xs[distinct].tolist(), self.ys[distinct].tolist()).compute()
+        return distinct[hull].tolist()
+
+    # (D / 2) * tan(pi / k) with D the bounding box diagonal
+    def error_bound(self):
+        quarter = len(self.cos) // 4
+        width = self.values[0] + self.values[2 * quarter]
+        height = self.values[quarter] + self.values[3 * quarter]
+        return math.hypot(width, height) / 2 * math.tan(math.pi / len(self.cos))
+
+    # returns an ApproximateResult
+    def result(self):
+        if self.points == 0:
+            return ApproximateResult([], [], len(self.cos), 0, 0.0)
+        hull = self.hull()
+        vertices = list(zip(self.xs[hull].tolist(), self.ys[hull].tolist()))
+        return ApproximateResult(self.indices[hull].tolist(), vertices, len(self.cos), self.points,
+                                 self.error_bound())
+
+
+# Approximate hull of xs/ys in one call.
+# returns an ApproximateResult
+def approximate_hull(xs, ys, tolerance):
+    approximate = ApproximateHull(tolerance)
+    approximate.add(xs, ys)
+    return approximate.result()
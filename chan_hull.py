@@ -0,0 +1,139 @@
+from hull_engine import HullEngine
+from hull_predicates import ORIENTATION_ERROR, beyond, exact_orientation
+from hull_prefilter import cull_interior
+
+#
+# Output-sensitive O(n log h) engine (Chan's algorithm).
+#
+# Each round guesses a hull size m, splits the points into groups of m, hulls
+# every group with the divide-and-conquer solver and then gift-wraps around the
+# group hulls for at most m steps.  If the wrap doesn't close, m is squared and
+# the round repeated.  The result is in the same clockwise order, starting at
+# the leftmost point, as HullEngine.compute.
+#
+
+
+class ChanEngine(HullEngine):
+
+    # workers is accepted so the engines are interchangeable; the rounds run serially
+    def compute(self, workers=1, cull=False):
+        n = len(self.xs)
+        if n < 2:
+            return list(range(n))
+
+        points = list(range(n))
+        self.culled_points = 0
+        if cull:
+            points, self.culled_points = cull_interior(self.xs, self.ys)
+            n = len(points)
+
+        xs = self.xs
+        ys = self.ys
+        start = min(points, key=lambda i: (xs[i], ys[i]))
+
+        t = 1
+        while True:
+            m = min(2 ** (2 ** t), n)
+            hulls = self.group_hulls(points, m)
+            hull = self.wrap_groups(hulls, start, m)
+            if hull is not None:
+                return hull
+            # a point inside its own group's hull is inside the full hull too,
+            # so the next round only needs the group hull vertices
+            points = [point for group_hull in hulls for point in group_hull]
+            n = len(points)
+            t += 1
+
+    # hull every group of m consecutive points, each in canonical clockwise order
+    def group_hulls(self, points, m):
+        hulls = []
+        for start in range(0, len(points), m):
+            group = self.sort_points(points[start:start + m])
+            if len(group) == 1:
+                hulls.append(group)
+            else:
+                hulls.append(self.convex_hull_solver(group)[0])
+        return hulls
+
+    # Gift-wrap clockwise around the group hulls starting at the leftmost point.
+    # returns the hull, or None if it has more than m vertices
+    def wrap_groups(self, hulls, start, m):
+        # the tangent point of every group only ever moves clockwise during a wrap
+        pointers = [0] * len(hulls)
+
+        xs = self.xs
+        ys = self.ys
+        hull = [start]
+        current = start
+        for _ in range(m):
+            best = None
+            for group, group_hull in enumerate(hulls):
+                pointers[group] = self.find_group_tangent(current, group_hull, pointers[group])
+                candidate = group_hull[pointers[group]]
+                # the current point itself, or a copy of it in another group
+                if xs[candidate] == xs[current] and ys[candidate] == ys[current]:
+                    continue
+                if best is None or self.is_better_turn(current, best, candidate):
+                    best = candidate
+
+            # wrapped all the way around
+            if best is None or (xs[best] == xs[start] and ys[best] == ys[start]):
+                return hull
+            hull.append(best)
+            current = best
+
+        return None
+
+    # Tangent query: starting at position k of a clockwise group hull, walk
+    # clockwise while the next vertex makes a better turn from point
+    # (see is_better_turn, inlined here since this is the hot loop).
+    # returns the position of the group's vertex that the wrap should go to next
+    def find_group_tangent(self, point, group_hull, k):
+        xs = self.xs
+        ys = self.ys
+        px = xs[point]
+        py = ys[point]
+        length = len(group_hull)
+        best = group_hull[k]
+        bx = xs[best] - px
+        by = ys[best] - py
+        for _ in range(length):
+            next_position = k + 1
+            if next_position == length:
+                next_position = 0
+            vertex = group_hull[next_position]
+            cx = xs[vertex] - px
+            cy = ys[vertex] - py
+            left = bx * cy
+            right = by * cx
+            cross = left - right
+            if abs(cross) <= ORIENTATION_ERROR * (abs(left) + abs(right)):
+                cross = exact_orientation(px, py, xs[best], ys[best], xs[vertex], ys[vertex])
+            if cross < 0 or (cross == 0 and not beyond(px, py, xs[best], ys[best], xs[vertex], ys[vertex])):
+                break
+            k = next_position
+            best = vertex
+            bx = cx
+            by = cy
+        return k
+
+    # True if candidate lies to the left of the line from point through best,
+    # or on it and farther away (hull_predicates.beyond); i.e. it is a better next hull vertex when
+    # wrapping clockwise
+    def is_better_turn(self, point, best, candidate):
+        xs = self.xs
+        ys = self.ys
+        px = xs[point]
+        py = ys[point]
+        bx = xs[best] - px
+        by = ys[best] - py
+        cx = xs[candidate] - px
+        cy = ys[candidate] - py
+        left = bx * cy
+        right = by * cx
+        cross = left - right
+        if abs(cross) <= ORIENTATION_ERROR * (abs(left) + abs(right)):
+            cross = exact_orientation(px, py, xs[best], ys[best], xs[candidate], ys[candidate])
+        if cross != 0:
+            return cross > 0
+        return beyond(px, py, xs[best], ys[best], xs[candidate], ys[candidate])
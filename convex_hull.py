@@ -1,24 +1,33 @@
-import math
 
 from which_pyqt import PYQT_VER
 
 if PYQT_VER == 'PYQT5':
-    from PyQt5.QtCore import QLineF, QPointF, QObject
+    from PyQt5.QtCore import QLineF, QPointF, QObject, QTimer, pyqtSignal, pyqtSlot
 elif PYQT_VER == 'PYQT4':
-    from PyQt4.QtCore import QLineF, QPointF, QObject
+    from PyQt4.QtCore import QLineF, QPointF, QObject, QTimer, pyqtSignal, pyqtSlot
 elif PYQT_VER == 'PYQT6':
-    from PyQt6.QtCore import QLineF, QPointF, QObject
+    from PyQt6.QtCore import QLineF, QPointF, QObject, QTimer, pyqtSignal, pyqtSlot
 else:
     raise Exception('Unsupported Version of PyQt: {}'.format(PYQT_VER))
 
+import threading
 import time
 
+from approx_hull import approximate_hull
+from engines import ENGINES
+from hull_cache import coordinates_key
+from hull_events import ReplayState, recording
+from hull_progress import SolveCancelled, with_progress
+from hull_query import HullIndex
+from hull_stats import instrumented
+
 # Some global color constants that might be useful
 RED = (255, 0, 0)
 GREEN = (0, 255, 0)
 BLUE = (0, 0, 255)
 
 # Global variable that controls the speed of the recursion automation, in seconds
+# per recorded event (the default frame rate of HullReplay)
 #
 PAUSE = 0.25
 
@@ -29,9 +38,20 @@ PAUSE = 0.25
 class ConvexHullSolver(QObject):
 
     # Class constructor
-    def __init__(self):
+    # instrument=True collects a hull_stats.HullStats for every solve into
+    # self.stats, and calls on_merge(stats, event) after every merge.
+    # cache is a hull_cache.HullCache to look hulls up in before solving; it
+    # is skipped by recorded and instrumented solves, which need a real run
+    def __init__(self, instrument=False, on_merge=None, cache=None):
         super().__init__()
         self.pause = False
+        self.instrument = instrument
+        self.on_merge = on_merge
+        self.cache = cache
+        self.stats = None
+        self.replay = None
+        # x-order of the points of the last solve, the next solve's order_hint
+        self.x_order = None
 
     # Some helper methods that make calls to the GUI, allowing us to send updates
     # to be displayed.
@@ -39,8 +59,6 @@ class ConvexHullSolver(QObject):
     def showTangent(self, line, color):
         line = [line]
         self.view.addLines(line, color)
-        if self.pause:
-            time.sleep(PAUSE)
 
     def eraseTangent(self, line):
         line = [line]
@@ -52,8 +70,6 @@ class ConvexHullSolver(QObject):
 
     def showHull(self, polygon, color):
         self.view.addLines(polygon, color)
-        if self.pause:
-            time.sleep(PAUSE)
 
     def eraseHull(self, polygon):
         self.view.clearLines(polygon)
@@ -64,113 +80,91 @@ class ConvexHullSolver(QObject):
     # This is the method that gets called by the GUI and actually executes
     # the finding of the hull
     # points are QPointF -> (x,y)
-    def compute_hull(self, points, pause, view):
+    # pause records the merges and animates them afterwards with a HullReplay
+    # (kept in self.replay), instead of drawing the hull straight away
+    # engine picks one of ENGINES,
+    # workers > 1 runs the top of the recursion on that many processes,
+    # cull drops interior points before the sort (Akl-Toussaint),
+    # tolerance switches to an approximate hull (see computeApproximateHull)
+    # returns the hull vertices (QPointF's) clockwise from the leftmost point
+    def compute_hull(self, points, pause, view, workers=1, cull=False, engine='divide', tolerance=None):
         self.pause = pause
         self.view = view
         assert (type(points) == list and type(points[0]) == QPointF)
+        if tolerance is not None:
+            return self.computeApproximateHull(points, tolerance)
 
         t1 = time.time()
-        # SORT THE POINTS BY INCREASING X-VALUE
-        points.sort(key=lambda x: x.x())
+        # copy the coordinates out of the QPointF's once, the engine only works on plain floats
+        xs = [point.x() for point in points]
+        ys = [point.y() for point in points]
+
+        key = None
+        hull = None
+        if self.cache is not None and not pause and not self.instrument:
+            key = coordinates_key(xs, ys)
+            hull = self.cache.get(key)
+        cached = hull is not None
+
+        if not cached:
+            # the engine returns the hull as clockwise indices into xs/ys
+            engine_class = ENGINES[engine]
+            if pause:
+                engine_class = recording(engine_class)
+            if self.instrument:
+                solver = instrumented(engine_class)(xs, ys, self.on_merge)
+            else:
+                solver = engine_class(xs, ys)
+            solver.order_hint = self.x_order
+            hull = solver.compute(workers, cull)
+            if len(solver.x_order or ()) == len(xs):
+                self.x_order = solver.x_order
+            self.stats = solver.stats if self.instrument else None
+            if key is not None:
+                self.cache.put(key, hull)
+        hull_points = [points[i] for i in hull]
+        polygon = self.getPolygonFromPoints(hull_points)
         t2 = time.time()
 
-        t3 = time.time()
-        # this is a dummy polygon of the first 3 unsorted points
-        # polygon = [QLineF(points[i], points[(i + 1) % 3]) for i in range(3)]
-        polygon = self.getPolygonFromPoints(self.convex_hull_solver(points))
-        t4 = time.time()
-
         # when passing lines to the display, pass a list of QLineF objects.  Each QLineF
         # object can be created with two QPointF objects corresponding to the endpoints
-        self.showHull(polygon, GREEN)
-        self.showText('Time Elapsed (Convex Hull): {:3.3f} sec'.format(t4 - t3))
-
-    def convex_hull_solver(self, points):
-        # base cases
-        # merge going back up (on return)
-        if len(points) == 2 or len(points) == 3:
-            return points
-        # sort the hulls
-        # merge the hulls
-        # return merged hull
+        if pause:
+            self.replay = HullReplay(points, solver.events, hull_points, view)
+            self.replay.start()
         else:
-            lower_points, upper_points = self.divide_points_in_half(points)
-            # keep dividing points in half
-            # return merged hull with new divided points (recursion)
-            return self.merge_two_hulls(
-                self.convex_hull_solver(lower_points),
-                self.convex_hull_solver(upper_points)
-            )
-
-    # combine two hulls
-    # return a list of sorted points representing the shape of the new hull
-    # send list of tangent lines (adjacent points in list) to GUI
-    # right and left hulls are lists of QPointF's (x,y)
-    def merge_two_hulls(self, left_hull, right_hull):
-        new_hull = []
-
-        # rightmost of left hull will be last point in list of points sorted by x value
-        rightmost_of_left = max(left_hull, key=lambda point: point.x())
-        # leftmost of right hull will be the first point in list of points sorted by x value
-        leftmost_of_right = min(right_hull, key=lambda point: point.x())
-
-        # sort hulls
-        left_hull = self.sort_hull(left_hull)
-        right_hull = self.sort_hull(right_hull)
-
-        # find upper tangent line
-        upper_tangent_line_points = self.find_upper_tangent(left_hull, right_hull, rightmost_of_left, leftmost_of_right)
-        # self.blinkTangent(QLineF(upper_tangent_line_points[0], upper_tangent_line_points[1]), RED)
-        # find lower tangent line
-        lower_tangent_line_points = self.find_lower_tangent(left_hull, right_hull, rightmost_of_left, leftmost_of_right)
-        # self.blinkTangent(QLineF(lower_tangent_line_points[0], lower_tangent_line_points[1]), BLUE)
-
-        # get new points for merged hull
-        combinedHullPoints = self.combineHullsWithTangents(
-            left_hull
-            , right_hull
-            , upper_tangent_line_points
-            , lower_tangent_line_points
-        )
-        new_hull.append(combinedHullPoints)
-
-        polygon = self.getPolygonFromPoints(combinedHullPoints)
-        # return new hull as polygon
-        return combinedHullPoints
-
-    def combineHullsWithTangents(self, leftHull, rightHull, upperTan, lowerTan):
-        points = []
-        currLeftIndex = 0
-        currRightIndex = 0
-
-        while True:
-            points.append(leftHull[currLeftIndex])
-            if leftHull[currLeftIndex] == upperTan[0]:
-                # jump to right hull and continue
-                currRightIndex = rightHull.index(upperTan[1])
-                break
-            else:
-                currLeftIndex += 1
-                if currLeftIndex == len(leftHull):
-                    currLeftIndex = 0
-
-        while True:
-            points.append(rightHull[currRightIndex])
-            if rightHull[currRightIndex] == lowerTan[1]:
-                currLeftIndex = leftHull.index(lowerTan[0])
-                break
-            else:
-                currRightIndex += 1
-                if currRightIndex == len(rightHull):
-                    currRightIndex = 0
+            self.showHull(polygon, GREEN)
+        text = 'Time Elapsed (Convex Hull): {:3.3f} sec'.format(t2 - t1)
+        if cached:
+            text += ' (cached)'
+        elif cull:
+            text += ', {} interior points culled'.format(solver.culled_points)
+        self.showText(text)
+        return hull_points
+
+    # Approximate hull of the points in one pass (approx_hull): a polygon of
+    # input points inside the true hull that no point of the true hull is
+    # farther than tolerance times the diameter of the points from.  The
+    # exact engines aren't run, and the cache, pause and instrumentation don't
+    # apply.
+    # returns the vertices (QPointF's) clockwise from the leftmost point
+    def computeApproximateHull(self, points, tolerance):
+        t1 = time.time()
+        xs = [point.x() for point in points]
+        ys = [point.y() for point in points]
+        result = approximate_hull(xs, ys, tolerance)
+        hull_points = [points[i] for i in result.indices]
+        t2 = time.time()
 
-        while currLeftIndex != 0:
-            points.append(leftHull[currLeftIndex])
-            currLeftIndex += 1
-            if currLeftIndex == len(leftHull):
-                break
+        self.stats = None
+        self.showHull(self.getPolygonFromPoints(hull_points), GREEN)
+        self.showText('Time Elapsed (Approximate Hull): {:3.3f} sec, {} directions, error at most {:.3g}'.format(
+            t2 - t1, result.directions, result.error_bound))
+        return hull_points
 
-        return points
+    # A hull_query.HullIndex for O(log h) point-in-hull, extreme point and
+    # tangent queries against the hull points compute_hull returned
+    def getIndexFromPoints(self, points):
+        return HullIndex((point.x(), point.y()) for point in points)
 
     def getPolygonFromPoints(self, points):
         polygon = []
@@ -182,216 +176,146 @@ class ConvexHullSolver(QObject):
         polygon.append(QLineF(points[len(points) - 1], points[0]))
         return polygon
 
-    # sort a hull's points by decreasing slope between leftmost and rest of points
-    def sort_hull(self, points):
-        sorted_hull = []
-        left_most = points[0]
-
-        # leftmost point at the beginning
-        sorted_hull.append(left_most)
-
-        # remove leftmost from list
-        points.remove(left_most)
-
-        # sort according to decreasing slope
-        points.sort(key=lambda point: self.find_slope(left_most, point), reverse=True)
-
-        # add to list
-        for i in range(len(points)):
-            sorted_hull.append(points[i])
-
-        # self.showHull(self.getPolygonFromPoints(points), BLUE)
-
-        return sorted_hull
-
-    # find the slope between two points
-    def find_slope(self, start_point, end_point):
-
-        slope = (end_point.y() - start_point.y()) / (end_point.x() - start_point.x())
-
-        return slope
-
-    # split up points based on x-values
-    def divide_points_in_half(self, points):
-        length = len(points)
-        mid = math.floor(length / 2)
-        lower_half = []
-        upper_half = []
-        for i in range(0, mid):
-            lower_half.append(points[i])
-
-        for i in range(mid, length):
-            upper_half.append(points[i])
-
-        return lower_half, upper_half
-
-    # find the upper tangent of two hulls
-    def find_upper_tangent(self, left_hull_points, right_hull_points, rightmost_of_left, leftmost_of_right):
-
-        # start with line between rightmost of left and leftmost of right
-        current_tangent_line = [rightmost_of_left, leftmost_of_right]
-        change_made = True
-
-        # keep track of current indices starting at closest points between hulls.
-        # Guaranteed to have at least two points.
-        # Start at next point in clockwise direction for right hull
-        right_hull_current_index = 1
-        # Start at next point in counter-clockwise direction for lef hull
-        left_hull_current_index = left_hull_points.index(rightmost_of_left) - 1
-
-        # length of list of points representing hulls to enable index folding
-        left_hull_length = len(left_hull_points)
-        right_hull_length = len(right_hull_points)
-
-        # keep switching between right and left hulls until no change is made in current tangent line
-        while change_made:
-
-            # default to no change
-            change_made = False
 
-            # will run until slope decreases
-            while True:
-
-                # new slope found between current tan line point on left hull and next right hull point
-                new_slope = self.find_slope(current_tangent_line[0], right_hull_points[right_hull_current_index])
-                # current slope found between current tan line points
-                current_slope = self.find_slope(current_tangent_line[0], current_tangent_line[1])
-
-                # if the new slope is greater than the current slope, replace point2 in the tangent line
-                if new_slope > current_slope:
-
-                    # replace point 2 in the tangent line
-                    current_tangent_line[1] = right_hull_points[right_hull_current_index]
-                    # move on to next point in right hull, moving clockwise
-                    right_hull_current_index += 1
-
-                    # if we've reached the end of the right hull, wrap back around
-                    if right_hull_current_index == right_hull_length:
-                        right_hull_current_index = 0
-
-                # if the new slope is less than the current slope, we need to switch pivots
-                elif new_slope < current_slope:
-                    # switch
-                    break
-
-            # will run until slope increases
-            while True:
-
-                # new slope found between current tan line point on right hull and next left hull point
-                new_slope = self.find_slope(current_tangent_line[1], left_hull_points[left_hull_current_index])
-                # current slope found between current tan line points
-                current_slope = self.find_slope(current_tangent_line[1], current_tangent_line[0])
-
-                # If the new slope is less than the current slope, replace point1 in the tangent line
-                if new_slope < current_slope:
-
-                    # replace point1 in the tangent line
-                    current_tangent_line[0] = left_hull_points[left_hull_current_index]
-                    # move on to next point in right hull, moving counter-clockwise
-                    left_hull_current_index -= 1
-
-                    # if we've reached the end of the hull, wrap back around
-                    if left_hull_current_index == -1:
-                        left_hull_current_index = left_hull_length - 1
-
-                    # a change in the tangent line was made, we need to switch back to the right side.
-                    change_made = True
-
-                # if the new slope is greater than the current slope, we break.
-                # if a change was made, we'll switch
-                elif new_slope > current_slope:
-                    # switch if change was made
-                    break
-
-        # return a QLineF containing QPoints representing upper tangent line
-        return current_tangent_line[0], current_tangent_line[1]
-
-    # find the lower tangent of two hulls
-    # inverse of find_upper_tangent
-    def find_lower_tangent(self, left_hull_points, right_hull_points, rightmost_of_left, leftmost_of_right):
-
-        # start with line between rightmost of left and leftmost of right
-        current_tangent_line = [rightmost_of_left, leftmost_of_right]
-        change_made = True
-
-        # length of list of points representing hulls to enable index folding
-        left_hull_length = len(left_hull_points)
-        right_hull_length = len(right_hull_points)
-
-        # keep track of current indices starting at closest points between hulls.
-        # Guaranteed to have at least two points.
-        # Start at next point in counter-clockwise direction for right hull
-        right_hull_current_index = len(right_hull_points) - 1
-        # Start at next point in clockwise direction for lef hull
-        left_hull_current_index = left_hull_points.index(rightmost_of_left) + 1
-        if(left_hull_current_index == len(left_hull_points)):
-            left_hull_current_index = 0
-
-        # keep switching between right and left hulls until no change is made in current tangent line
-        while change_made:
-
-            # default to no change
-            change_made = False
-
-            # will run until slope increases
-            while True:
-
-                # new slope found between current tan line point on left hull and next right hull point
-                new_slope = self.find_slope(current_tangent_line[0], right_hull_points[right_hull_current_index])
-                # current slope found between current tan line points
-                current_slope = self.find_slope(current_tangent_line[0], current_tangent_line[1])
-
-                # if the new slope is less than the current slope, replace point2 in the tangent line
-                if new_slope < current_slope:
-
-                    # replace point 2 in the tangent line
-                    current_tangent_line[1] = right_hull_points[right_hull_current_index]
-                    # move on to next point in right hull, moving counter-clockwise
-                    right_hull_current_index -= 1
-
-                    # if we've reached the end of the right hull, wrap back around
-                    if right_hull_current_index == -1:
-                        right_hull_current_index = right_hull_length - 1
-
-                # if the new slope is greater than the current slope, we need to switch pivots
-                elif new_slope > current_slope:
-                    # switch
-                    break
-
-                else:
-                    break
-
-            # will run until slope decreases
-            while True:
-
-                # new slope found between current tan line point on right hull and next left hull point
-                new_slope = self.find_slope(current_tangent_line[1], left_hull_points[left_hull_current_index])
-                # current slope found between current tan line points
-                current_slope = self.find_slope(current_tangent_line[1], current_tangent_line[0])
+#
+# Runs a solve off the GUI thread.  Move it to a QThread and start run() there;
+# everything it reports comes back through signals, which Qt queues onto the
+# receiver's thread, so the worker never touches the view.
+#
+class HullWorker(QObject):
+
+    # merges done, merges total, points the recursion hasn't reached yet
+    progress = pyqtSignal(int, int, int)
+    # hull vertices (QPointF's) clockwise from the leftmost point, seconds taken
+    # and the hull_events.EventLog of the solve (None unless recording)
+    solved = pyqtSignal(list, float, object)
+    cancelled = pyqtSignal()
+    failed = pyqtSignal(str)
+
+    # points is the list of QPointF's to hull; workers and cull as for compute_hull,
+    # record keeps an event log for HullReplay.  cache is a hull_cache.HullCache
+    # for solves that aren't recorded, and may be shared with other workers.
+    # order_hint is the x_order of an earlier worker on the same points
+    def __init__(self, points, workers=1, cull=False, record=False, cache=None, order_hint=None):
+        super().__init__()
+        self.points = points
+        self.workers = workers
+        self.cull = cull
+        self.record = record
+        self.cache = cache
+        self.order_hint = order_hint
+        # x-order of the points once solved, for the order_hint of the next worker
+        self.x_order = order_hint
+        self.cancel_requested = threading.Event()
+
+    # called directly from the GUI thread, the worker's own event loop is busy
+    def cancel(self):
+        self.cancel_requested.set()
+
+    @pyqtSlot()
+    def run(self):
+        try:
+            t1 = time.time()
+            xs = [point.x() for point in self.points]
+            ys = [point.y() for point in self.points]
+            key = None
+            hull = None
+            if self.cache is not None and not self.record:
+                key = coordinates_key(xs, ys)
+                hull = self.cache.get(key)
+            if hull is None:
+                engine_class = ENGINES['divide']
+                if self.record:
+                    engine_class = recording(engine_class)
+                solver = with_progress(engine_class)(xs, ys, self.progress.emit, self.cancel_requested.is_set)
+                solver.order_hint = self.order_hint
+                hull = solver.compute(self.workers, self.cull)
+                if len(solver.x_order or ()) == len(xs):
+                    self.x_order = solver.x_order
+                if key is not None:
+                    self.cache.put(key, hull)
+            t2 = time.time()
+        except SolveCancelled:
+            self.cancelled.emit()
+            return
+        except Exception as e:
+            self.failed.emit(str(e))
+            return
+        events = solver.events if self.record else None
+        self.solved.emit([self.points[i] for i in hull], t2 - t1, events)
 
-                # If the new slope is greater than the current slope, replace point1 in the tangent line
-                if new_slope > current_slope:
-
-                    # replace point1 in the tangent line
-                    current_tangent_line[0] = left_hull_points[left_hull_current_index]
-                    # move on to next point in right hull, moving clockwise
-                    left_hull_current_index += 1
 
-                    # if we've reached the end of the hull, wrap back around
-                    if left_hull_current_index == left_hull_length:
-                        left_hull_current_index = 0
+#
+# Plays a recorded solve (a hull_events.EventLog) back on a view, one event
+# every 1/fps seconds, so the animation runs at its own pace after the solve
+# has finished.  seek() jumps to any event, skip() straight to the final hull.
+#
+class HullReplay(QObject):
 
-                    # a change in the tangent line was made, we need to switch back to the right side.
-                    change_made = True
-
-                # if the new slope is less than the current slope, we break.
-                # if a change was made, we'll switch
-                elif new_slope < current_slope:
-                    # switch if change was made
-                    break
+    # number of events played so far
+    position_changed = pyqtSignal(int)
+    finished = pyqtSignal()
 
-                else:
-                    break
+    # points are the QPointF's the events index into, hull_points the final hull
+    def __init__(self, points, events, hull_points, view, fps=1.0 / PAUSE):
+        super().__init__()
+        self.points = points
+        self.events = events
+        self.hull_points = hull_points
+        self.view = view
+        self.state = ReplayState()
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.step)
+        self.set_fps(fps)
+
+    def __len__(self):
+        return len(self.events)
+
+    def set_fps(self, fps):
+        self.timer.setInterval(max(1, int(1000 / fps)))
+
+    def start(self):
+        self.timer.start()
+
+    def stop(self):
+        self.timer.stop()
+
+    def step(self):
+        if self.state.position >= len(self.events):
+            self.finish()
+            return
+        self.state.apply(self.events, self.state.position)
+        self.draw()
+
+    def seek(self, position):
+        position = max(0, min(position, len(self.events)))
+        if position < self.state.position:
+            self.state = ReplayState.at(self.events, position)
+        while self.state.position < position:
+            self.state.apply(self.events, self.state.position)
+        self.draw()
+
+    def skip(self):
+        self.seek(len(self.events))
+        self.finish()
+
+    def finish(self):
+        self.timer.stop()
+        self.view.clearLines()
+        self.view.addLines(self.polygon(self.hull_points), GREEN)
+        self.finished.emit()
+
+    def draw(self):
+        points = self.points
+        hull_lines = []
+        for hull in self.state.hulls.values():
+            hull_lines.extend(self.polygon([points[i] for i in hull]))
+        tangent_lines = [QLineF(points[left], points[right]) for left, right in self.state.tangents]
+        self.view.clearLines()
+        self.view.addLines(hull_lines, BLUE)
+        self.view.addLines(tangent_lines, RED)
+        self.position_changed.emit(self.state.position)
+
+    def polygon(self, points):
+        return [QLineF(points[i], points[(i + 1) % len(points)]) for i in range(len(points))]
 
-        # return a QLineF containing QPoints representing upper tangent line
-        return current_tangent_line[0], current_tangent_line[1]
@@ -0,0 +1,12 @@
+from chan_hull import ChanEngine
+from hull_engine import BottomUpEngine, HullEngine
+
+# The hull engines, by name.  'divide' is the O(n log n) divide-and-conquer,
+# 'chan' the output-sensitive O(n log h) one, 'bottomup' the divide-and-conquer
+# merged iteratively instead of recursively.  All of them take (xs, ys) and
+# have compute(workers, cull) return clockwise indices from the leftmost point.
+ENGINES = {
+    'divide': HullEngine,
+    'chan': ChanEngine,
+    'bottomup': BottomUpEngine,
+}
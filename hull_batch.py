@@ -0,0 +1,178 @@
+from collections import namedtuple
+
+import numpy as np
+
+from hull_engine import HullEngine
+from hull_predicates import ORIENTATION_ERROR, exact_orientation
+
+#
+# Hulls of many small point sets in one call.
+#
+# The sets come packed CSR-style: one (N, 2) coordinate array holding every
+# set back to back, and offsets such that set k is rows offsets[k] up to
+# offsets[k + 1].  The hulls go back in the same layout.
+#
+# The whole batch is sorted by (x, y) with one lexsort, and sets of up to
+# three points (whose hull is just their canonical order) are done as array
+# operations across the batch.  Only the larger sets reach the engine, all sharing one
+# HullEngine over the batch coordinates and skipping its sort.  cull=True
+# first drops the points strictly inside each set's extreme point octagon
+# (hull_prefilter), again for the whole batch at once.
+#
+# Sets of more than three points are still hulled one at a time, by the
+# engine's recursion in a Python loop: neither their base cases nor their
+# merges are vectorized.  The merges' tangent walks are nearly all of that
+# time, so without cull a batch of such sets runs at about the speed of one
+# engine call per set, and the batch-wide cull is where the speed-up for
+# them comes from.
+#
+
+# indices are rows of the batch coordinate array, each hull clockwise from
+# its leftmost point; hull k is indices[offsets[k]:offsets[k + 1]]
+BatchHulls = namedtuple('BatchHulls', 'indices offsets')
+
+
+# directions of the extreme points, counter-clockwise from +x
+# (hull_prefilter.extreme_octagon)
+OCTAGON_DIRECTIONS = ((1, 0), (1, 1), (0, 1), (-1, 1), (-1, 0), (-1, -1), (0, -1), (1, -1))
+
+
+# Mask of the rows of a packed batch that are not strictly inside the extreme
+# point octagon of their set.  Sets of 3 points or fewer are kept whole.
+def cull_batch(coords, offsets):
+    sizes = np.diff(offsets)
+    keep = np.ones(len(coords), dtype=bool)
+    culled = sizes > 3
+    if not np.any(culled):
+        return keep
+
+    # the rows of the sets being culled, and their offsets among those rows
+    rows = np.flatnonzero(np.repeat(culled, sizes))
+    counts = sizes[culled]
+    starts = np.zeros(len(counts), dtype=np.int64)
+    np.cumsum(counts[:-1], out=starts[1:])
+    x = coords[rows, 0]
+    y = coords[rows, 1]
+    positions = np.arange(len(rows))
+
+    corners_x = []
+    corners_y = []
+    for a, b in OCTAGON_DIRECTIONS:
+        value = a * x + b * y
+        best = np.repeat(np.maximum.reduceat(value, starts), counts)
+        # first row of every set reaching its maximum
+        corner = np.minimum.reduceat(np.where(value == best, positions, len(rows)), starts)
+        corners_x.append(np.repeat(x[corner], counts))
+        corners_y.append(np.repeat(y[corner], counts))
+
+    inside = np.ones(len(rows), dtype=bool)
+    # equal corners are neighbours around the octagon, so this counts the
+    # distinct ones
+    corners = np.zeros(len(rows), dtype=np.int64)
+    for i in range(len(OCTAGON_DIRECTIONS)):
+        ax, ay = corners_x[i], corners_y[i]
+        dx = corners_x[(i + 1) % 8] - ax
+        dy = corners_y[(i + 1) % 8] - ay
+        corners += (dx != 0) | (dy != 0)
+        # certainly to the left of every counter-clockwise edge, by the error
+        # bound of hull_predicates: rows it is unsure about are kept for the
+        # engine's exact predicates.  Neighbouring directions often share a
+        # corner, and those empty edges are skipped
+        first = dx * (y - ay)
+        second = dy * (x - ax)
+        certain = first - second > ORIENTATION_ERROR * (np.abs(first) + np.abs(second))
+        inside &= certain | ((dx == 0) & (dy == 0))
+    # with fewer than 3 corners there is no inside, as in
+    # hull_prefilter.cull_interior, and every edge would be skipped
+    inside &= corners >= 3
+    keep[rows[inside]] = False
+    return keep
+
+
+# coords is an (N, 2) array, offsets k + 1 non-decreasing row numbers from 0 to N
+# returns a BatchHulls
+def hull_batch(coords, offsets, cull=False):
+    coords = np.asarray(coords, dtype=np.float64)
+    offsets = np.asarray(offsets, dtype=np.int64)
+    if coords.ndim != 2 or coords.shape[1] != 2:
+        raise ValueError('Expected an Nx2 coordinate array, got shape {}'.format(coords.shape))
+    if offsets.ndim != 1 or len(offsets) == 0 or offsets[0] != 0 or offsets[-1] != len(coords):
+        raise ValueError('offsets must run from 0 to the number of points')
+    sizes = np.diff(offsets)
+    if np.any(sizes < 0):
+        raise ValueError('offsets must be non-decreasing')
+
+    if cull:
+        # hull the survivors, then map their rows back to the full batch
+        kept = np.flatnonzero(cull_batch(coords, offsets))
+        kept_offsets = np.searchsorted(kept, offsets)
+        hulls = hull_batch(coords[kept], kept_offsets)
+        return BatchHulls(kept[hulls.indices], hulls.offsets)
+
+    # every set sorted by (x, y) in place; lexsort is stable, so equal points
+    # keep their input order just like HullEngine.sort_points
+    set_ids = np.repeat(np.arange(len(sizes)), sizes)
+    order = np.lexsort((coords[:, 1], coords[:, 0], set_ids))
+
+    # keep only the first of any equal points in a set, as HullEngine.sort_points
+    ordered = coords[order]
+    repeated = np.zeros(len(order), dtype=bool)
+    repeated[1:] = (set_ids[1:] == set_ids[:-1]) & np.all(ordered[1:] == ordered[:-1], axis=1)
+    if np.any(repeated):
+        kept = np.sort(order[~repeated])
+        kept_offsets = np.searchsorted(kept, offsets)
+        hulls = hull_batch(coords[kept], kept_offsets)
+        return BatchHulls(kept[hulls.indices], hulls.offsets)
+
+    hull_sizes = np.minimum(sizes, 3)
+    big = np.flatnonzero(sizes > 3)
+
+    # sets of 1-3 points: their hull is their sorted order, the middle one of
+    # three moving last when it lies below the left-right line and dropped
+    # when it lies on it (HullEngine.order_base_hull)
+    small_hulls = order.copy()
+    dropped = np.zeros(len(order), dtype=bool)
+    triples = offsets[:-1][sizes == 3]
+    if len(triples):
+        left = order[triples]
+        middle = order[triples + 1]
+        right = order[triples + 2]
+        x = coords[:, 0]
+        y = coords[:, 1]
+        # the filtered orientation test of hull_predicates, redoing the few
+        # unsure ones exactly
+        first = (x[right] - x[left]) * (y[middle] - y[left])
+        second = (y[right] - y[left]) * (x[middle] - x[left])
+        turn = first - second
+        unsure = np.flatnonzero(np.abs(turn) <= ORIENTATION_ERROR * (np.abs(first) + np.abs(second)))
+        for i in unsure.tolist():
+            turn[i] = exact_orientation(x[left[i]], y[left[i]], x[right[i]], y[right[i]],
+                                        x[middle[i]], y[middle[i]])
+        lower = turn <= 0
+        small_hulls[triples[lower] + 1] = right[lower]
+        small_hulls[triples[lower] + 2] = middle[lower]
+        collinear = turn == 0
+        dropped[triples[collinear] + 2] = True
+        hull_sizes[sizes == 3] -= collinear
+
+    # the larger sets, one engine over the whole batch
+    big_hulls = []
+    if len(big):
+        # the engine gets the coordinates in sorted order, so every set is a
+        # contiguous run of indices and its hull maps back through order
+        engine = HullEngine(coords[order, 0].tolist(), coords[order, 1].tolist())
+        for k in big.tolist():
+            hull, rightmost = engine.convex_hull_solver(list(range(offsets[k], offsets[k + 1])))
+            big_hulls.append(hull)
+        hull_sizes[big] = [len(hull) for hull in big_hulls]
+
+    hull_offsets = np.zeros(len(sizes) + 1, dtype=np.int64)
+    np.cumsum(hull_sizes, out=hull_offsets[1:])
+
+    # both kinds of set are copied into place with one mask each
+    indices = np.empty(hull_offsets[-1], dtype=np.int64)
+    is_small = sizes <= 3
+    indices[np.repeat(is_small, hull_sizes)] = small_hulls[np.repeat(is_small, sizes) & ~dropped]
+    if big_hulls:
+        indices[np.repeat(~is_small, hull_sizes)] = order[np.concatenate(big_hulls)]
+    return BatchHulls(indices, hull_offsets)
@@ -0,0 +1,451 @@
+#!/usr/bin/env python3
+
+import argparse
+import csv
+import json
+import math
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from engines import ENGINES
+from hull_batch import hull_batch
+from hull_engine import HullEngine, mixed_engine, split_coordinates
+from hull_stats import instrumented
+from point_generator import DISTRIBUTIONS
+from window_hull import SlidingWindowHull
+from warm_hull import WarmHull
+import point_generator
+
+#
+# Headless benchmarks for the hull engines.  Nothing here imports Qt.
+#
+
+
+# Benchmark inputs as xs/ys lists, drawn by point_generator with the given
+# seed so they match what the GUI generates for the same seed
+def generate_points(distribution, npoints, seed):
+    return split_coordinates(point_generator.generate_points(distribution, npoints, seed))
+
+
+# best-of-repeats wall time of a full engine run on n points
+def time_engine(npoints, repeats, seed=0, workers=1, cull=False, engine=HullEngine):
+    xs, ys = generate_points('uniform', npoints, seed)
+    best = math.inf
+    for _ in range(repeats):
+        t1 = time.perf_counter()
+        engine(xs, ys).compute(workers, cull)
+        t2 = time.perf_counter()
+        best = min(best, t2 - t1)
+    return best
+
+
+# Time the engine over a range of sizes and report how the running time scales.
+# 'exponent' is the log-log slope between consecutive sizes; for an
+# O(n log n) solver the per-(n log2 n) cost stays flat, for O(n log^2 n) it
+# keeps growing with log n.
+def scaling(sizes, repeats, workers=1, cull=False, engine=HullEngine):
+    rows = []
+    previous = None
+    for n in sizes:
+        elapsed = time_engine(n, repeats, workers=workers, cull=cull, engine=engine)
+        row = {
+            'n': n,
+            'seconds': elapsed,
+            'ns_per_nlogn': 1e9 * elapsed / (n * math.log2(n)),
+            'exponent': None,
+        }
+        if previous is not None:
+            row['exponent'] = math.log(elapsed / previous['seconds']) / math.log(n / previous['n'])
+        rows.append(row)
+        previous = row
+    return rows
+
+
+def print_scaling(rows):
+    print('{:>10} {:>12} {:>14} {:>10}'.format('n', 'seconds', 'ns/(n log2 n)', 'exponent'))
+    for row in rows:
+        exponent = '' if row['exponent'] is None else '{:.3f}'.format(row['exponent'])
+        print('{:>10} {:>12.4f} {:>14.2f} {:>10}'.format(row['n'], row['seconds'], row['ns_per_nlogn'], exponent))
+
+
+# Slide a window of the given size over a stream of points and compare the
+# windowed hull structure against re-running the engine on every slide.
+# returns seconds per update for both
+def window(npoints, size, seed=0):
+    xs, ys = generate_points('uniform', npoints, seed)
+
+    t1 = time.perf_counter()
+    sliding = SlidingWindowHull(max_points=size)
+    for i in range(npoints):
+        sliding.append(xs[i], ys[i])
+        sliding.vertices()
+    t2 = time.perf_counter()
+
+    for i in range(npoints):
+        start = max(0, i + 1 - size)
+        HullEngine(xs[start:i + 1], ys[start:i + 1]).compute()
+    t3 = time.perf_counter()
+
+    return {
+        'window': size,
+        'updates': npoints,
+        'sliding_seconds_per_update': (t2 - t1) / npoints,
+        'recompute_seconds_per_update': (t3 - t2) / npoints,
+    }
+
+
+# Hull `sets` clusters of min_size to max_size points each, once through
+# hull_batch and once with an engine per cluster.  Every cluster is a small
+# gaussian blob around its own centre.
+# returns total seconds for both
+def batch(sets, min_size, max_size, cull=False, seed=0):
+    rng = np.random.default_rng(seed)
+    sizes = rng.integers(min_size, max_size + 1, sets)
+    offsets = np.zeros(sets + 1, dtype=np.int64)
+    np.cumsum(sizes, out=offsets[1:])
+    centres = np.repeat(rng.uniform(-1.0, 1.0, (sets, 2)), sizes, axis=0)
+    coords = centres + rng.normal(0.0, 0.01, centres.shape)
+
+    t1 = time.perf_counter()
+    hull_batch(coords, offsets, cull)
+    t2 = time.perf_counter()
+    for k in range(sets):
+        xs, ys = split_coordinates(coords[offsets[k]:offsets[k + 1]])
+        HullEngine(xs, ys).compute(1, cull)
+    t3 = time.perf_counter()
+
+    return {
+        'sets': sets,
+        'points': int(offsets[-1]),
+        'batch_seconds': t2 - t1,
+        'loop_seconds': t3 - t2,
+    }
+
+
+# Move npoints points by a small gaussian step every frame and hull every
+# frame twice: cold, an engine run from scratch as compute_hull does, and
+# warm, with a WarmHull that starts from the previous frame.
+# returns seconds per frame for both and the WarmHull counters
+def frames(npoints, nframes, step, distribution='uniform', engine='divide', cull=False, seed=0):
+    rng = np.random.default_rng(seed)
+    coords = point_generator.generate_points(distribution, npoints, seed)
+    warm = WarmHull(engine, cull=cull)
+    cold_seconds = 0.0
+    warm_seconds = 0.0
+    for _ in range(nframes):
+        coords += rng.normal(0.0, step, coords.shape)
+        xs = coords[:, 0]
+        ys = coords[:, 1]
+
+        t1 = time.perf_counter()
+        ENGINES[engine](xs.tolist(), ys.tolist()).compute(1, cull)
+        t2 = time.perf_counter()
+        warm.update(xs, ys)
+        t3 = time.perf_counter()
+        cold_seconds += t2 - t1
+        warm_seconds += t3 - t2
+
+    stats = warm.stats()
+    return {
+        'points': npoints,
+        'frames': nframes,
+        'step': step,
+        'cold_seconds_per_frame': cold_seconds / nframes,
+        'warm_seconds_per_frame': warm_seconds / nframes,
+        'warm_frames': stats.warm_frames,
+        'rebuilds': stats.rebuilds,
+        'candidates': stats.candidates,
+    }
+
+
+# Engine mixin for memory(): notes the traced memory at the end of the sort
+# and restarts the peak from there, and samples the allocator's block count at
+# the end of the sort and at every merge
+class MemoryProbe:
+
+    def __init__(self, xs, ys):
+        super().__init__(xs, ys)
+        self.sort_peak = 0
+        self.sorted_bytes = 0
+        self.sorted_blocks = 0
+        self.peak_blocks = 0
+
+    def sort_points(self, points):
+        order = super().sort_points(points)
+        if tracemalloc.is_tracing():
+            self.sorted_bytes, self.sort_peak = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+        self.sorted_blocks = self.peak_blocks = sys.getallocatedblocks()
+        return order
+
+    def merge_two_hulls(self, left, right):
+        blocks = sys.getallocatedblocks()
+        if blocks > self.peak_blocks:
+            self.peak_blocks = blocks
+        return super().merge_two_hulls(left, right)
+
+
+# Memory of one solve of npoints uniform points: the traced peak up to the end
+# of the sort, over what was allocated before the solve, and the traced peak
+# and the most allocator blocks in use during the merges, over what the
+# sorted order left allocated.  The blocks are counted in a second solve
+# without tracemalloc, and the time in a third one without either.
+def memory(npoints, engine='divide', seed=0):
+    xs, ys = generate_points('uniform', npoints, seed)
+    engine_class = ENGINES[engine]
+    probed = mixed_engine('Probed', MemoryProbe, engine_class)
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    solver = probed(xs, ys)
+    solver.compute()
+    merge_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    counted = probed(xs, ys)
+    counted.compute()
+
+    t1 = time.perf_counter()
+    engine_class(xs, ys).compute()
+    t2 = time.perf_counter()
+
+    return {
+        'engine': engine,
+        'points': npoints,
+        'seconds': t2 - t1,
+        'sort_peak_bytes': solver.sort_peak - before,
+        'merge_peak_bytes': merge_peak - solver.sorted_bytes,
+        'merge_peak_blocks': counted.peak_blocks - counted.sorted_blocks,
+    }
+
+
+# Engine mixin for suite(): times the sort, the tangent searches and the
+# combines, and nothing else.  That costs two clock reads per timed call: at
+# 2 * 10^5 uniform points a phase-timed solve runs about 20% over a plain one
+# (30% for chan, which makes a tangent query per group per wrap step).
+# The counters of hull_stats come from a separate instrumented solve, whose
+# per-orientation-test counting would swamp these timings.
+class PhaseTimer:
+
+    def reset_phases(self):
+        self.phases = {'sort': 0.0, 'tangent': 0.0, 'combine': 0.0}
+
+    # one clock read per phase boundary, inlined: these run once per merge
+    def sort_points(self, points):
+        t1 = time.perf_counter()
+        order = super().sort_points(points)
+        self.phases['sort'] += time.perf_counter() - t1
+        return order
+
+    def find_upper_tangent(self, left_hull, right_hull, rightmost_of_left):
+        t1 = time.perf_counter()
+        tangent = super().find_upper_tangent(left_hull, right_hull, rightmost_of_left)
+        self.phases['tangent'] += time.perf_counter() - t1
+        return tangent
+
+    def find_lower_tangent(self, left_hull, right_hull, rightmost_of_left):
+        t1 = time.perf_counter()
+        tangent = super().find_lower_tangent(left_hull, right_hull, rightmost_of_left)
+        self.phases['tangent'] += time.perf_counter() - t1
+        return tangent
+
+    def find_group_tangent(self, point, group_hull, k):
+        t1 = time.perf_counter()
+        k = super().find_group_tangent(point, group_hull, k)
+        self.phases['tangent'] += time.perf_counter() - t1
+        return k
+
+    def combineHullsWithTangents(self, *args):
+        t1 = time.perf_counter()
+        combined = super().combineHullsWithTangents(*args)
+        self.phases['combine'] += time.perf_counter() - t1
+        return combined
+
+
+PHASE_ENGINES = {name: mixed_engine('PhaseTimed', PhaseTimer, engine) for name, engine in ENGINES.items()}
+
+
+# short commit hash of the tree being measured, or 'unknown'
+def source_version():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+# Sweep engine x distribution x n.  Every repeat does a plain timed solve, a
+# second, phase-timed solve (PhaseTimer) and a third, instrumented one for the
+# counters; 'recursion' is the phase-timed time not spent sorting, finding
+# tangents or combining (dividing, base cases, call overhead).
+# returns one row per repeat
+def suite(engines, distributions, sizes, repeats, seed=0, cull=False, version=None):
+    if version is None:
+        version = source_version()
+    rows = []
+    for distribution in distributions:
+        for n in sizes:
+            xs, ys = generate_points(distribution, n, seed)
+            for name in engines:
+                for repeat in range(repeats):
+                    t1 = time.perf_counter()
+                    hull = ENGINES[name](xs, ys).compute(1, cull)
+                    t2 = time.perf_counter()
+
+                    timed = PHASE_ENGINES[name](xs, ys)
+                    timed.reset_phases()
+                    t3 = time.perf_counter()
+                    timed.compute(1, cull)
+                    t4 = time.perf_counter()
+                    phases = timed.phases
+
+                    counted = instrumented(ENGINES[name])(xs, ys)
+                    counted.compute(1, cull)
+                    stats = counted.stats
+
+                    rows.append({
+                        'version': version,
+                        'engine': name,
+                        'distribution': distribution,
+                        'n': n,
+                        'seed': seed,
+                        'cull': cull,
+                        'repeat': repeat,
+                        'hull_size': len(hull),
+                        'seconds': t2 - t1,
+                        'sort': phases['sort'],
+                        'recursion': (t4 - t3) - sum(phases.values()),
+                        'tangent': phases['tangent'],
+                        'combine': phases['combine'],
+                        'merges': stats.merges,
+                        'max_depth': stats.max_depth,
+                        'orientation_calls': stats.orientation_calls,
+                        'tangent_steps': stats.upper_tangent_steps + stats.lower_tangent_steps,
+                    })
+    return rows
+
+
+SUITE_FIELDS = ['version', 'engine', 'distribution', 'n', 'seed', 'cull', 'repeat', 'hull_size',
+                'seconds', 'sort', 'recursion', 'tangent', 'combine',
+                'merges', 'max_depth', 'orientation_calls', 'tangent_steps']
+
+
+def write_csv(rows, path):
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=SUITE_FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def write_json(rows, path):
+    with open(path, 'w') as f:
+        json.dump({'python': platform.python_version(), 'machine': platform.machine(), 'rows': rows}, f, indent=1)
+
+
+# medians over the repeats of every (engine, distribution, n)
+def print_suite(rows):
+    groups = {}
+    for row in rows:
+        groups.setdefault((row['engine'], row['distribution'], row['n']), []).append(row)
+    print('{:>8} {:>10} {:>10} {:>6} {:>10} {:>10} {:>10} {:>10} {:>10}'.format(
+        'engine', 'dist', 'n', 'h', 'seconds', 'sort', 'recursion', 'tangent', 'combine'))
+    for (engine, distribution, n), group in groups.items():
+        medians = [statistics.median(row[field] for row in group)
+                   for field in ('seconds', 'sort', 'recursion', 'tangent', 'combine')]
+        print('{:>8} {:>10} {:>10} {:>6} {:>10.4f} {:>10.4f} {:>10.4f} {:>10.4f} {:>10.4f}'.format(
+            engine, distribution, n, group[0]['hull_size'], *medians))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Convex hull engine benchmarks')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    scaling_parser = commands.add_parser('scaling', help='engine running time against n')
+    scaling_parser.add_argument('--sizes', type=int, nargs='+', default=[100000, 200000, 500000, 1000000])
+    scaling_parser.add_argument('--repeats', type=int, default=3)
+    scaling_parser.add_argument('--workers', type=int, default=1)
+    scaling_parser.add_argument('--cull', action='store_true', help='drop interior points before sorting')
+    scaling_parser.add_argument('--engine', choices=sorted(ENGINES), default='divide')
+
+    window_parser = commands.add_parser('window', help='sliding-window hull against full recompute')
+    window_parser.add_argument('--points', type=int, default=20000)
+    window_parser.add_argument('--size', type=int, default=1000)
+
+    batch_parser = commands.add_parser('batch', help='hull_batch against an engine per point set')
+    batch_parser.add_argument('--sets', type=int, default=100000)
+    batch_parser.add_argument('--min-size', type=int, default=5)
+    batch_parser.add_argument('--max-size', type=int, default=500)
+    batch_parser.add_argument('--cull', action='store_true', help='drop interior points before sorting')
+
+    frames_parser = commands.add_parser('frames', help='warm-started re-hull of moving points against cold solves')
+    frames_parser.add_argument('--points', type=int, default=100000)
+    frames_parser.add_argument('--frames', type=int, default=50)
+    frames_parser.add_argument('--step', type=float, default=0.001, help='standard deviation of a move per frame')
+    frames_parser.add_argument('--distribution', choices=DISTRIBUTIONS, default='uniform')
+    frames_parser.add_argument('--engine', choices=sorted(ENGINES), default='divide')
+    frames_parser.add_argument('--cull', action='store_true', help='drop interior points before sorting')
+
+    memory_parser = commands.add_parser('memory', help='peak memory of the sort and of the merges')
+    memory_parser.add_argument('--points', type=int, default=1000000)
+    memory_parser.add_argument('--engines', nargs='+', choices=sorted(ENGINES), default=sorted(ENGINES))
+
+    suite_parser = commands.add_parser('suite', help='phase timings over engine, distribution and n')
+    suite_parser.add_argument('--sizes', type=int, nargs='+', default=[10 ** k for k in range(1, 8)])
+    suite_parser.add_argument('--engines', nargs='+', choices=sorted(ENGINES), default=sorted(ENGINES))
+    suite_parser.add_argument('--distributions', nargs='+', choices=DISTRIBUTIONS, default=list(DISTRIBUTIONS))
+    suite_parser.add_argument('--repeats', type=int, default=3)
+    suite_parser.add_argument('--seed', type=int, default=0)
+    suite_parser.add_argument('--cull', action='store_true', help='drop interior points before sorting')
+    suite_parser.add_argument('--version', help='label for the results (default: current commit)')
+    suite_parser.add_argument('--csv', help='write the per-repeat results to this CSV file')
+    suite_parser.add_argument('--json', help='write the per-repeat results to this JSON file')
+
+    args = parser.parse_args()
+    if args.command == 'suite':
+        rows = suite(args.engines, args.distributions, args.sizes, args.repeats, args.seed, args.cull, args.version)
+        print_suite(rows)
+        if args.csv:
+            write_csv(rows, args.csv)
+        if args.json:
+            write_json(rows, args.json)
+    elif args.command == 'window':
+        result = window(args.points, args.size)
+        print('window of {window} points, {updates} updates'.format(**result))
+        print('sliding hull:     {:10.1f} us/update'.format(1e6 * result['sliding_seconds_per_update']))
+        print('full recompute:   {:10.1f} us/update'.format(1e6 * result['recompute_seconds_per_update']))
+    elif args.command == 'batch':
+        result = batch(args.sets, args.min_size, args.max_size, args.cull)
+        print('{sets} sets, {points} points'.format(**result))
+        print('hull_batch:       {:10.3f} s'.format(result['batch_seconds']))
+        print('engine per set:   {:10.3f} s'.format(result['loop_seconds']))
+    elif args.command == 'frames':
+        result = frames(args.points, args.frames, args.step, args.distribution, args.engine, args.cull)
+        print('{points} points, {frames} frames, step {step}'.format(**result))
+        print('cold solve:       {:10.4f} s/frame'.format(result['cold_seconds_per_frame']))
+        print('warm update:      {:10.4f} s/frame'.format(result['warm_seconds_per_frame']))
+        print('{warm_frames} frames updated warm, {rebuilds} rebuilt, '
+              '{candidates} candidates in the last frame'.format(**result))
+    elif args.command == 'memory':
+        print('{:>10} {:>10} {:>10} {:>14} {:>14} {:>14}'.format(
+            'engine', 'n', 'seconds', 'sort peak MB', 'merge peak MB', 'merge blocks'))
+        for engine in args.engines:
+            result = memory(args.points, engine)
+            print('{:>10} {:>10} {:>10.3f} {:>14.1f} {:>14.1f} {:>14}'.format(
+                engine, result['points'], result['seconds'], result['sort_peak_bytes'] / 1e6,
+                result['merge_peak_bytes'] / 1e6, result['merge_peak_blocks']))
+    else:
+        print_scaling(scaling(args.sizes, args.repeats, args.workers, args.cull, ENGINES[args.engine]))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+from array import array
+from collections import OrderedDict, namedtuple
+import hashlib
+import threading
+
+#
+# Content-addressed cache of computed hulls.
+#
+# A hull is stored under a digest of the coordinates it was computed from, so
+# hulling the same points again (the same seed in the GUI, a repeated query)
+# is a hash instead of a sort and a recursion.  Entries are evicted least
+# recently used first once the stored hulls outgrow the memory budget.  One
+# cache can be shared by every thread of a process; two threads missing on the
+# same points at once both solve, and the second result simply replaces the
+# first.
+#
+
+DEFAULT_MAX_BYTES = 64 << 20
+
+# rough cost of one entry besides its hull: the key, the OrderedDict node and
+# the array header
+ENTRY_OVERHEAD = 200
+
+CacheStats = namedtuple('CacheStats', 'hits misses evictions entries bytes')
+
+
+# Digest of a point set given as parallel xs/ys float sequences (lists,
+# array('d') or 1-d NumPy float64 arrays); equal coordinates give equal keys
+# whichever of those they come in
+def coordinates_key(xs, ys):
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(len(xs).to_bytes(8, 'little'))
+    for values in (xs, ys):
+        if isinstance(values, array):
+            digest.update(values)
+        elif hasattr(values, 'tobytes'):
+            digest.update(values.tobytes())
+        else:
+            digest.update(array('d', values))
+    return digest.digest()
+
+
+class HullCache:
+
+    # max_bytes bounds the memory held by the cached hulls
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    # the hull stored under key as a list of indices, or None
+    def get(self, key):
+        with self.lock:
+            hull = self.entries.get(key)
+            if hull is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+        return hull.tolist()
+
+    def put(self, key, hull):
+        hull = array('q', hull)
+        size = ENTRY_OVERHEAD + hull.itemsize * len(hull)
+        if size > self.max_bytes:
+            return
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.bytes -= ENTRY_OVERHEAD + old.itemsize * len(old)
+            self.entries[key] = hull
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                key, old = self.entries.popitem(last=False)
+                self.bytes -= ENTRY_OVERHEAD + old.itemsize * len(old)
+                self.evictions += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.bytes = 0
+
+    def stats(self):
+        with self.lock:
+            return CacheStats(self.hits, self.misses, self.evictions, len(self.entries), self.bytes)
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+
+from array import array
+import argparse
+import csv
+import io
+import os
+import sys
+import time
+
+from engines import ENGINES
+from hull_engine import split_coordinates
+
+#
+# Command-line hulling of point files, for batch jobs without a display.
+# Nothing here imports Qt.
+#
+# Points are read from a file or stdin in one of three formats:
+#   csv  one "x,y" row per point, an optional header row first
+#   npy  a NumPy (N, 2) array (needs NumPy)
+#   bin  native float64 values x0 y0 x1 y1 ..., the mmap_hull point file format
+# and the hull is written in the same formats, as vertices clockwise from the
+# leftmost point or, with --indices, as the input row of each vertex.
+#
+#   python hull_cli.py points.csv
+#   python hull_cli.py points.bin --to npy -o hull.npy --engine chan --time
+#   cat points.csv | python hull_cli.py - --indices --cull
+#   python hull_cli.py points.bin --tolerance 0.001
+#
+# --tolerance writes an approximate hull instead (approx_hull, needs NumPy):
+# no point of the true hull is farther from it than that fraction of the
+# diameter of the points.
+#
+
+FORMATS = ('csv', 'npy', 'bin')
+
+
+# format of a path from its extension, csv for stdin/stdout or anything unknown
+def guess_format(path):
+    extension = os.path.splitext(path)[1].lower().lstrip('.')
+    return extension if extension in FORMATS else 'csv'
+
+
+# Read points as xs/ys lists from a binary stream
+def read_points(stream, fmt):
+    if fmt == 'csv':
+        xs = []
+        ys = []
+        rows = csv.reader(io.StringIO(stream.read().decode('utf-8'), newline=''))
+        for line, row in enumerate(rows):
+            if not row or row[0].lstrip().startswith('#'):
+                continue
+            try:
+                x, y = float(row[0]), float(row[1])
+            except (ValueError, IndexError):
+                if line == 0 or not xs:
+                    # header row
+                    continue
+                raise ValueError('Line {}: expected "x,y", got {!r}'.format(line + 1, ','.join(row)))
+            xs.append(x)
+            ys.append(y)
+        return xs, ys
+
+    if fmt == 'npy':
+        import numpy as np
+        # np.load needs to seek, which stdin can't
+        coords = np.load(io.BytesIO(stream.read()), allow_pickle=False)
+        return split_coordinates(coords.astype(np.float64, copy=False))
+
+    if fmt == 'bin':
+        data = stream.read()
+        if len(data) % 16 != 0:
+            raise ValueError('Input is not a whole number of float64 (x, y) pairs')
+        values = array('d')
+        values.frombytes(data)
+        return split_coordinates(values)
+
+    raise ValueError('Unknown format: {}'.format(fmt))
+
+
+# Write the hull to a binary stream, as the vertices (x, y) or, with indices,
+# as the input row of every vertex
+def write_hull(stream, fmt, hull, xs, ys, indices=False):
+    if fmt == 'csv':
+        text = io.TextIOWrapper(stream, encoding='utf-8', newline='')
+        if indices:
+            text.writelines('{}\n'.format(i) for i in hull)
+        else:
+            text.writelines('{!r},{!r}\n'.format(xs[i], ys[i]) for i in hull)
+        text.flush()
+        text.detach()
+        return
+
+    if fmt == 'npy':
+        import numpy as np
+        if indices:
+            result = np.array(hull, dtype=np.int64)
+        else:
+            result = np.array([(xs[i], ys[i]) for i in hull], dtype=np.float64).reshape(-1, 2)
+        np.save(stream, result, allow_pickle=False)
+        return
+
+    if fmt == 'bin':
+        if indices:
+            result = array('q', hull)
+        else:
+            result = array('d')
+            for i in hull:
+                result.append(xs[i])
+                result.append(ys[i])
+        stream.write(result.tobytes())
+        return
+
+    raise ValueError('Unknown format: {}'.format(fmt))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Convex hull of a point file')
+    parser.add_argument('input', help="point file, or - for stdin")
+    parser.add_argument('-o', '--output', default='-', help='where to write the hull (default: stdout)')
+    parser.add_argument('--from', dest='input_format', choices=FORMATS,
+                        help='input format (default: from the extension, csv for stdin)')
+    parser.add_argument('--to', dest='output_format', choices=FORMATS,
+                        help='output format (default: from the extension, else the input format)')
+    parser.add_argument('--indices', action='store_true', help='write input row numbers instead of vertices')
+    parser.add_argument('--engine', choices=sorted(ENGINES), default='divide')
+    parser.add_argument('--workers', type=int, default=1, help='processes for the top of the recursion')
+    parser.add_argument('--cull', action='store_true', help='drop interior points before sorting')
+    parser.add_argument('--tolerance', type=float,
+                        help='approximate hull within this fraction of the diameter of the points')
+    parser.add_argument('--time', action='store_true', help='print read/solve/write timings to stderr')
+    args = parser.parse_args(argv)
+
+    input_format = args.input_format or guess_format(args.input)
+    if args.output_format:
+        output_format = args.output_format
+    elif args.output != '-':
+        output_format = guess_format(args.output)
+    else:
+        output_format = input_format
+
+    try:
+        t1 = time.perf_counter()
+        if args.input == '-':
+            xs, ys = read_points(sys.stdin.buffer, input_format)
+        else:
+            with open(args.input, 'rb') as f:
+                xs, ys = read_points(f, input_format)
+        t2 = time.perf_counter()
+
+        if args.tolerance is not None:
+            from approx_hull import approximate_hull
+            approximate = approximate_hull(xs, ys, args.tolerance)
+            hull = approximate.indices
+        else:
+            solver = ENGINES[args.engine](xs, ys)
+            hull = solver.compute(args.workers, args.cull)
+        t3 = time.perf_counter()
+
+        if args.output == '-':
+            write_hull(sys.stdout.buffer, output_format, hull, xs, ys, args.indices)
+            sys.stdout.buffer.flush()
+        else:
+            with open(args.output, 'wb') as f:
+                write_hull(f, output_format, hull, xs, ys, args.indices)
+        t4 = time.perf_counter()
+    except (OSError, ValueError) as e:
+        print('{}: {}'.format(parser.prog, e), file=sys.stderr)
+        return 1
+
+    if args.time:
+        if args.tolerance is not None:
+            print('{} points, {} hull vertices from {} directions, error at most {:.3g}'.format(
+                len(xs), len(hull), approximate.directions, approximate.error_bound), file=sys.stderr)
+        else:
+            print('{} points, {} hull vertices, {} culled'.format(len(xs), len(hull), solver.culled_points),
+                  file=sys.stderr)
+        print('read {:.4f} s, solve {:.4f} s, write {:.4f} s'.format(t2 - t1, t3 - t2, t4 - t3), file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,450 @@
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+import math
+
+from hull_predicates import ORIENTATION_ERROR, beyond, exact_orientation, orientation
+from hull_prefilter import cull_interior
+from hull_sort import sort_by_x, sort_unique
+
+#
+# Qt-free convex hull engine.
+#
+# Points live in two plain float lists (xs, ys) and every hull is a list of
+# indices into them, so the hot loops below never touch a Qt object.  The
+# ConvexHullSolver in convex_hull.py is only an adapter around this class.
+#
+# Points are ordered by (x, y), equal points dropped, and every geometric
+# decision is an exact-sign orientation test (hull_predicates), so equal
+# x-values, repeated points and collinear runs need no special handling by
+# the caller.  Hulls never keep a vertex in the middle of a straight edge.
+#
+
+# Smallest number of points per worker for which a parallel solve is worth
+# the cost of starting processes and shipping coordinates to them
+PARALLEL_MIN_CHUNK = 10000
+
+
+# Turn a block of coordinates into two lists of plain floats (xs, ys).
+# Accepts a NumPy float64 array of shape (N, 2), a flat interleaved
+# array('d') of the form x0, y0, x1, y1, ... or any sequence of (x, y) pairs.
+def split_coordinates(coords):
+    if hasattr(coords, 'ndim'):
+        if coords.ndim != 2 or coords.shape[1] != 2:
+            raise ValueError('Expected an Nx2 coordinate array, got shape {}'.format(coords.shape))
+        return coords[:, 0].tolist(), coords[:, 1].tolist()
+
+    if isinstance(coords, array):
+        if len(coords) % 2 != 0:
+            raise ValueError('Interleaved coordinate array must have an even length')
+        return coords[0::2].tolist(), coords[1::2].tolist()
+
+    xs = [float(point[0]) for point in coords]
+    ys = [float(point[1]) for point in coords]
+    return xs, ys
+
+
+# Compute the hull of a block of coordinates (see split_coordinates) and return
+# the indices of the hull vertices in clockwise order, starting at the leftmost.
+# workers > 1 spreads the top of the recursion over that many processes,
+# cull drops interior points with the Akl-Toussaint pre-filter first.
+def hull_indices(coords, workers=1, cull=False):
+    xs, ys = split_coordinates(coords)
+    return HullEngine(xs, ys).compute(workers, cull)
+
+
+# number of 2-3 point base cases convex_hull_solver splits n points into
+@lru_cache(maxsize=None)
+def base_cases(n):
+    if n <= 3:
+        return 1
+    half = n // 2
+    return base_cases(half) + base_cases(n - half)
+
+
+# The subclass of engine_class with mixin in front of it, named prefix plus the
+# engine's name.  Built once per (mixin, engine class), so that every solve
+# through instrumented(), recording() or with_progress() shares one class.
+@lru_cache(maxsize=None)
+def mixed_engine(prefix, mixin, engine_class):
+    return type(prefix + engine_class.__name__, (mixin, engine_class), {})
+
+
+# Runs in a worker process: hull one x-sorted chunk given as array('d')
+# coordinates with engine_class's solver, and return it in canonical form with
+# chunk-local indices
+def _solve_chunk(engine_class, xs, ys):
+    hull, rightmost = engine_class(xs.tolist(), ys.tolist()).convex_hull_solver(list(range(len(xs))))
+    return array('l', hull), rightmost
+
+
+class HullEngine:
+
+    # xs and ys are parallel sequences of floats, one entry per point
+    def __init__(self, xs, ys):
+        if len(xs) != len(ys):
+            raise ValueError('xs and ys must have the same length')
+        self.xs = xs
+        self.ys = ys
+        # number of points the last compute(cull=True) removed before sorting
+        self.culled_points = 0
+        # the x-order of an earlier solve of the same points (all of them, in
+        # any order), which compute sorts from when it doesn't cull; a solve of
+        # the points in the same or nearly the same place then barely sorts
+        self.order_hint = None
+        # the x-order and the hull_sort method of the last sort
+        self.x_order = None
+        self.sort_method = None
+
+    # returns the indices of the hull vertices in clockwise order,
+    # starting at the leftmost point.
+    # workers > 1 runs the top levels of the recursion on a process pool,
+    # cull drops the points strictly inside the extreme point octagon first
+    def compute(self, workers=1, cull=False):
+        n = len(self.xs)
+        if n < 2:
+            return list(range(n))
+
+        points = range(n)
+        if self.order_hint is not None and len(self.order_hint) == n:
+            points = self.order_hint
+        self.culled_points = 0
+        if cull:
+            points, self.culled_points = cull_interior(self.xs, self.ys)
+
+        order = self.sort_points(points)
+        n = len(order)
+        # all the points may have been the same one
+        if n < 2:
+            return order
+
+        if workers > 1 and n >= 2 * PARALLEL_MIN_CHUNK:
+            hull, rightmost = self.parallel_solver(order, workers)
+        else:
+            hull, rightmost = self.convex_hull_solver(order)
+        return hull
+
+    # SORT THE POINT INDICES BY INCREASING X-VALUE, then y for equal x,
+    # keeping only the lowest index of any equal points (see hull_sort)
+    def sort_points(self, points):
+        self.x_order, self.sort_method, ties = sort_by_x(self.xs, points)
+        # equal x-values are rare in real coordinates, and only they need y
+        if not ties:
+            return self.x_order
+        return sort_unique(self.xs, self.ys, points)
+
+    # Split the x-sorted indices exactly as the top log2(workers) levels of
+    # convex_hull_solver would, hull every piece in its own process and merge
+    # the results back up the same tree here in the parent.
+    # returns (hull, rightmost position) like convex_hull_solver
+    def parallel_solver(self, points, workers):
+        xs = self.xs
+        ys = self.ys
+
+        chunks = [points]
+        while 2 * len(chunks) <= workers and len(chunks[-1]) >= 2 * PARALLEL_MIN_CHUNK:
+            chunks = [half for chunk in chunks for half in self.divide_points_in_half(chunk)]
+
+        # workers only get compact float arrays of their own chunk, and the
+        # plain engine class, since the subclasses instrumented() and friends
+        # build can't be pickled
+        chunk_xs = [array('d', [xs[i] for i in chunk]) for chunk in chunks]
+        chunk_ys = [array('d', [ys[i] for i in chunk]) for chunk in chunks]
+        engine_class = BottomUpEngine if isinstance(self, BottomUpEngine) else HullEngine
+        with ProcessPoolExecutor(max_workers=len(chunks)) as pool:
+            results = list(pool.map(_solve_chunk, [engine_class] * len(chunks), chunk_xs, chunk_ys))
+
+        # map chunk-local indices back to indices into xs/ys
+        hulls = []
+        for chunk, (local_hull, rightmost) in zip(chunks, results):
+            hulls.append(([chunk[i] for i in local_hull], rightmost))
+
+        while len(hulls) > 1:
+            hulls = [self.merge_two_hulls(hulls[i], hulls[i + 1]) for i in range(0, len(hulls), 2)]
+        return hulls[0]
+
+    # Every sub-hull is kept in canonical form: a list of point indices in
+    # clockwise order with the leftmost point at position 0, together with the
+    # position of its rightmost point.  Merges rely on that, so nothing is ever
+    # re-sorted or searched for.
+    # The recursion hulls points[start:end] (all of points by default) and
+    # passes index ranges down instead of slicing the list at every level, so
+    # the only lists it allocates are the 2-3 point base hulls and, in every
+    # merge, the stretch of the right hull copied into the left one.
+    # returns (hull, rightmost position)
+    def convex_hull_solver(self, points, start=0, end=None):
+        if end is None:
+            end = len(points)
+        # base cases
+        if end - start <= 3:
+            return self.order_base_hull(points[start:end])
+        else:
+            middle = start + (end - start) // 2
+            return self.merge_two_hulls(
+                self.convex_hull_solver(points, start, middle),
+                self.convex_hull_solver(points, middle, end)
+            )
+
+    # number of base cases, and so merges + 1, a solve of n >= 2 points takes
+    def count_base_cases(self, n):
+        return base_cases(n)
+
+    # put 2-3 sorted points into canonical clockwise order
+    def order_base_hull(self, points):
+        if len(points) == 2:
+            return points, 1
+        left, middle, right = points
+        # the middle point is on the upper chain if it lies above the left-right
+        # line, and not a vertex at all if it lies on it
+        turn = self.orientation(left, right, middle)
+        if turn > 0:
+            return [left, middle, right], 2
+        if turn < 0:
+            return [left, right, middle], 1
+        return [left, right], 1
+
+    # combine two canonical hulls (see convex_hull_solver), the left hull lying
+    # entirely to the left of the right hull.
+    # returns the merged hull in canonical form
+    def merge_two_hulls(self, left, right):
+        left_hull, rightmost_of_left = left
+        right_hull, rightmost_of_right = right
+
+        upper_tangent = self.find_upper_tangent(left_hull, right_hull, rightmost_of_left)
+        lower_tangent = self.find_lower_tangent(left_hull, right_hull, rightmost_of_left)
+
+        return self.combineHullsWithTangents(left_hull, right_hull, rightmost_of_right, upper_tangent, lower_tangent)
+
+    # upperTan and lowerTan are (left position, right position) pairs.
+    # Walking clockwise, the merged hull is the left hull up to the upper
+    # tangent, the right hull from the upper to the lower tangent, then the
+    # rest of the left hull back to its leftmost point.
+    # The left hull's list is reused for the result: the stretch of it between
+    # the tangents is replaced by the stretch of the right hull in one slice
+    # assignment, instead of copying both hulls into a new list.
+    def combineHullsWithTangents(self, leftHull, rightHull, rightmostOfRight, upperTan, lowerTan):
+        upperLeft, upperRight = upperTan
+        lowerLeft, lowerRight = lowerTan
+
+        points = leftHull
+        # the lower tangent may end on the leftmost point, which is already first
+        end = lowerLeft if lowerLeft != 0 else len(points)
+        if lowerRight >= upperRight:
+            points[upperLeft + 1:end] = rightHull[upperRight:lowerRight + 1]
+        else:
+            points[upperLeft + 1:end] = rightHull[upperRight:] + rightHull[:lowerRight + 1]
+
+        # the rightmost point of the right hull sits on its upper-to-lower stretch
+        rightmost = upperLeft + 1 + rightmostOfRight - upperRight
+        return points, rightmost
+
+    # hull_predicates.orientation of three points given by index
+    def orientation(self, a, b, c):
+        xs = self.xs
+        ys = self.ys
+        return orientation(xs[a], ys[a], xs[b], ys[b], xs[c], ys[c])
+
+    # True if c lies strictly to the left of the line from a through b, or on
+    # it beyond b.  A tangent end walking from b to c on this test (or on
+    # turns_right) turns strictly outwards or, along a straight edge, moves to
+    # the farther point, so the walks never stop on a collinear vertex.
+    # orientation is inlined here since this is the hot loop.
+    def turns_left(self, a, b, c):
+        xs = self.xs
+        ys = self.ys
+        ax = xs[a]
+        ay = ys[a]
+        bx = xs[b] - ax
+        by = ys[b] - ay
+        cx = xs[c] - ax
+        cy = ys[c] - ay
+        left = bx * cy
+        right = by * cx
+        turn = left - right
+        # the filter of hull_predicates.orientation, without the abs() calls
+        bound = ORIENTATION_ERROR * (left + right)
+        if turn * turn > bound * bound:
+            return turn > 0
+        turn = exact_orientation(ax, ay, xs[b], ys[b], xs[c], ys[c])
+        if turn == 0:
+            return beyond(ax, ay, xs[b], ys[b], xs[c], ys[c])
+        return turn > 0
+
+    # mirror image of turns_left: c strictly to the right of a -> b, or beyond b
+    def turns_right(self, a, b, c):
+        xs = self.xs
+        ys = self.ys
+        ax = xs[a]
+        ay = ys[a]
+        bx = xs[b] - ax
+        by = ys[b] - ay
+        cx = xs[c] - ax
+        cy = ys[c] - ay
+        left = bx * cy
+        right = by * cx
+        turn = left - right
+        bound = ORIENTATION_ERROR * (left + right)
+        if turn * turn > bound * bound:
+            return turn < 0
+        turn = exact_orientation(ax, ay, xs[b], ys[b], xs[c], ys[c])
+        if turn == 0:
+            return beyond(ax, ay, xs[b], ys[b], xs[c], ys[c])
+        return turn < 0
+
+    # split up the x-sorted point indices based on x-values
+    def divide_points_in_half(self, points):
+        mid = math.floor(len(points) / 2)
+        return points[:mid], points[mid:]
+
+    # find the upper tangent of two hulls.
+    # rightmost_of_left is the position of the rightmost point in left_hull;
+    # the leftmost point of right_hull is always at position 0.
+    # returns the tangent as a pair of positions (left, right) in the two hulls
+    def find_upper_tangent(self, left_hull, right_hull, rightmost_of_left):
+        turns_left = self.turns_left
+        turns_right = self.turns_right
+        left_length = len(left_hull)
+        right_length = len(right_hull)
+
+        # start with line between rightmost of left and leftmost of right
+        left_position = rightmost_of_left
+        right_position = 0
+
+        # next point clockwise on the right hull, counter-clockwise on the left hull
+        right_current = 1
+        left_current = rightmost_of_left - 1
+        if left_current == -1:
+            left_current = left_length - 1
+
+        # keep switching between right and left hulls until the left side stops moving
+        change_made = True
+        while change_made:
+            change_made = False
+
+            # walk the right hull clockwise while the tangent turns upwards
+            left_point = left_hull[left_position]
+            while True:
+                if turns_left(left_point, right_hull[right_position], right_hull[right_current]):
+                    right_position = right_current
+                    right_current += 1
+                    if right_current == right_length:
+                        right_current = 0
+                else:
+                    break
+
+            # walk the left hull counter-clockwise while the tangent turns upwards
+            right_point = right_hull[right_position]
+            while True:
+                if turns_right(right_point, left_hull[left_position], left_hull[left_current]):
+                    left_position = left_current
+                    left_current -= 1
+                    if left_current == -1:
+                        left_current = left_length - 1
+                    change_made = True
+                else:
+                    break
+
+        return left_position, right_position
+
+    # find the lower tangent of two hulls
+    # inverse of find_upper_tangent
+    def find_lower_tangent(self, left_hull, right_hull, rightmost_of_left):
+        turns_left = self.turns_left
+        turns_right = self.turns_right
+        left_length = len(left_hull)
+        right_length = len(right_hull)
+
+        # start with line between rightmost of left and leftmost of right
+        left_position = rightmost_of_left
+        right_position = 0
+
+        # next point counter-clockwise on the right hull, clockwise on the left hull
+        right_current = right_length - 1
+        left_current = rightmost_of_left + 1
+        if left_current == left_length:
+            left_current = 0
+
+        change_made = True
+        while change_made:
+            change_made = False
+
+            # walk the right hull counter-clockwise while the tangent turns downwards
+            left_point = left_hull[left_position]
+            while True:
+                if turns_right(left_point, right_hull[right_position], right_hull[right_current]):
+                    right_position = right_current
+                    right_current -= 1
+                    if right_current == -1:
+                        right_current = right_length - 1
+                else:
+                    break
+
+            # walk the left hull clockwise while the tangent turns downwards
+            right_point = right_hull[right_position]
+            while True:
+                if turns_left(right_point, left_hull[left_position], left_hull[left_current]):
+                    left_position = left_current
+                    left_current += 1
+                    if left_current == left_length:
+                        left_current = 0
+                    change_made = True
+                else:
+                    break
+
+        return left_position, right_position
+
+
+#
+# HullEngine without the recursion.  The x-sorted indices are cut into runs of
+# three points (the last one or two runs taking two, so the runs cover n
+# exactly) by index range, and the base hulls are merged on a stack like a
+# binary counter: whenever the top two hulls were built from the same number
+# of base hulls they are merged, so only neighbours of the same level are
+# ever combined, the point list is never split in halves and no more than
+# log2(n) unfinished hulls are held at once.
+# With workers > 1 the chunks of parallel_solver are hulled the same way.
+#
+class BottomUpEngine(HullEngine):
+
+    def __init__(self, xs, ys):
+        super().__init__(xs, ys)
+        # stack level of the hull the current merge makes, 1 for two base
+        # hulls; hull_stats reports it as the merge depth
+        self.stack_level = 0
+
+    def count_base_cases(self, n):
+        return max(1, (n + 2) // 3)
+
+    # returns (hull, rightmost position) like HullEngine.convex_hull_solver
+    def convex_hull_solver(self, points, start=0, end=None):
+        if end is None:
+            end = len(points)
+        n = end - start
+        if n <= 3:
+            return self.order_base_hull(points[start:end])
+        order_base_hull = self.order_base_hull
+        merge_two_hulls = self.merge_two_hulls
+
+        # runs from pairs_start on are pairs
+        pairs_start = end - 2 * ((3 - n % 3) % 3)
+
+        # (canonical hull, level) pairs, levels strictly decreasing upwards
+        stack = []
+        while start < end:
+            size = 3 if start < pairs_start else 2
+            hull = order_base_hull(points[start:start + size])
+            start += size
+            level = 0
+            while stack and stack[-1][1] == level:
+                level += 1
+                self.stack_level = level
+                hull = merge_two_hulls(stack.pop()[0], hull)
+            stack.append((hull, level))
+
+        # fold what is left from the right, smallest hulls first
+        hull = stack.pop()[0]
+        while stack:
+            left, level = stack.pop()
+            self.stack_level = level + 1
+            hull = merge_two_hulls(left, hull)
+        return hull
@@ -0,0 +1,116 @@
+from array import array
+
+from hull_engine import mixed_engine
+
+#
+# Recorded merge events for the "Show Recursion" animation.
+#
+# recording(engine_class) returns a subclass that appends what the animation
+# needs to an EventLog as the solve runs at full speed: every hull that gets
+# shown, the tangents each merge finds and the hulls a merge erases.  A replay
+# driver (convex_hull.HullReplay) then plays the log back at its own pace, and
+# ReplayState can rebuild the picture at any position for seeking.
+#
+
+# event kinds
+SHOW_HULL = 0
+TANGENT = 1
+ERASE_HULL = 2
+
+
+# Compact, append-only event log.  Event i is (kind, payload), the payload
+# being point indices for SHOW_HULL (the hull, clockwise) and TANGENT (left
+# and right end), and the index of the SHOW_HULL event being undone for
+# ERASE_HULL.  Everything is kept in three flat arrays.
+class EventLog:
+
+    def __init__(self):
+        self.kinds = array('b')
+        self.starts = array('q')
+        self.data = array('q')
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def __getitem__(self, i):
+        start = self.starts[i]
+        end = self.starts[i + 1] if i + 1 < len(self.starts) else len(self.data)
+        return self.kinds[i], self.data[start:end]
+
+    # returns the index of the new event
+    def add(self, kind, payload):
+        self.kinds.append(kind)
+        self.starts.append(len(self.data))
+        self.data.extend(payload)
+        return len(self.kinds) - 1
+
+
+# What is on screen after some prefix of a log: the hulls being shown, by the
+# index of their SHOW_HULL event, and the tangents of the current merge.
+class ReplayState:
+
+    def __init__(self):
+        self.position = 0
+        self.hulls = {}
+        self.tangents = []
+
+    # build the state after the first position events of log
+    @classmethod
+    def at(cls, log, position):
+        state = cls()
+        while state.position < position:
+            state.apply(log, state.position)
+        return state
+
+    def apply(self, log, i):
+        kind, payload = log[i]
+        if kind == SHOW_HULL:
+            # a new hull ends the merge whose tangents are showing
+            self.tangents = []
+            self.hulls[i] = payload
+        elif kind == TANGENT:
+            self.tangents.append(payload)
+        elif kind == ERASE_HULL:
+            self.hulls.pop(payload[0], None)
+        self.position = i + 1
+
+
+# Engine mixin that records into self.events
+class RecordingMixin:
+
+    def __init__(self, xs, ys, *args):
+        super().__init__(xs, ys, *args)
+        self.events = EventLog()
+        # SHOW_HULL event of every hull list on screen, keyed by id() of the list
+        self.shown = {}
+
+    def show(self, hull):
+        self.shown[id(hull)] = self.events.add(SHOW_HULL, hull)
+
+    def erase(self, hull):
+        # hulls from worker processes were never shown
+        if id(hull) not in self.shown:
+            self.show(hull)
+        self.events.add(ERASE_HULL, (self.shown.pop(id(hull)),))
+
+    def order_base_hull(self, points):
+        base = super().order_base_hull(points)
+        self.show(base[0])
+        return base
+
+    def merge_two_hulls(self, left, right):
+        merged = super().merge_two_hulls(left, right)
+        self.erase(left[0])
+        self.erase(right[0])
+        self.show(merged[0])
+        return merged
+
+    def combineHullsWithTangents(self, leftHull, rightHull, rightmostOfRight, upperTan, lowerTan):
+        self.events.add(TANGENT, (leftHull[upperTan[0]], rightHull[upperTan[1]]))
+        self.events.add(TANGENT, (leftHull[lowerTan[0]], rightHull[lowerTan[1]]))
+        return super().combineHullsWithTangents(leftHull, rightHull, rightmostOfRight, upperTan, lowerTan)
+
+
+# The recording version of an engine class; built once per class
+def recording(engine_class):
+    return mixed_engine('Recording', RecordingMixin, engine_class)
@@ -0,0 +1,62 @@
+from fractions import Fraction
+import sys
+
+#
+# Division-free orientation test with a floating-point filter.
+#
+# orientation() evaluates the usual 2x2 determinant in floats and trusts its
+# sign whenever the result is larger than the worst-case rounding error of the
+# computation (Shewchuk's bound for this evaluation order).  Only the
+# near-degenerate cases left over are redone in exact rational arithmetic, so
+# the sign is always right while the common case costs a few multiplications.
+#
+# The NumPy paths (hull_query, hull_batch, hull_prefilter) apply the same
+# bound, ORIENTATION_ERROR, to whole arrays, and either redo the unsure
+# entries with exact_orientation or, where a test only decides what may be
+# skipped, as in the culling, leave them to the exact engine.
+# test_hull_engines checks every engine against an exact reference.
+#
+
+# unit roundoff of a float64
+EPSILON = sys.float_info.epsilon / 2
+
+ORIENTATION_ERROR = (3.0 + 16.0 * EPSILON) * EPSILON
+
+
+# > 0 if c lies to the left of the line a -> b, < 0 to the right, 0 on it.
+# The sign is exact, the magnitude only meaningful when the filter passed.
+def orientation(ax, ay, bx, by, cx, cy):
+    left = (bx - ax) * (cy - ay)
+    right = (by - ay) * (cx - ax)
+    det = left - right
+    # |left| + |right| when left and right share a sign; when they don't, the
+    # subtraction can't cancel and det's sign is exact anyway.  Comparing
+    # squares saves the abs() calls, and rounding can't make them pass wrongly.
+    bound = ORIENTATION_ERROR * (left + right)
+    if det * det > bound * bound:
+        return det
+    return exact_orientation(ax, ay, bx, by, cx, cy)
+
+
+# orientation() of three (x, y) tuples
+def cross(a, b, c):
+    return orientation(a[0], a[1], b[0], b[1], c[0], c[1])
+
+
+# orientation() in exact arithmetic: 1, -1 or 0
+def exact_orientation(ax, ay, bx, by, cx, cy):
+    ax = Fraction(ax)
+    ay = Fraction(ay)
+    det = (Fraction(bx) - ax) * (Fraction(cy) - ay) - (Fraction(by) - ay) * (Fraction(cx) - ax)
+    return (det > 0) - (det < 0)
+
+
+# For a, b and c on one line: True if c lies farther from a than b does, on
+# b's side of a (when b is a itself, any other c).  It only compares input
+# coordinates, never their rounded differences, so it is exact.
+def beyond(ax, ay, bx, by, cx, cy):
+    if bx != ax:
+        return cx > bx if bx > ax else cx < bx
+    if by != ay:
+        return cy > by if by > ay else cy < by
+    return cx != ax or cy != ay
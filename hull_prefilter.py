@@ -0,0 +1,95 @@
+from hull_predicates import ORIENTATION_ERROR, orientation
+from hull_sort import NUMPY_MIN_POINTS, load_numpy
+
+#
+# Akl-Toussaint interior point culling.
+#
+# The points extreme in x, y, x+y and x-y span an octagon (fewer corners if
+# some coincide).  Everything strictly inside it cannot be on the hull, and for
+# the distributions Proj2GUI generates that is nearly every point, so culling
+# before the sort leaves the solver only a small fraction of the input.
+#
+# "Strictly inside" uses the error bound of hull_predicates: a point is only
+# dropped when the float orientation against every edge is certainly positive.
+# A point the filter is unsure about is kept, and the engine's exact
+# predicates decide it like any other.
+#
+# Below NUMPY_MIN_POINTS points, or without NumPy, the same is done in plain
+# Python, and NumPy isn't imported.
+#
+
+
+# Indices of the extreme points, in counter-clockwise order around the octagon
+def extreme_octagon(xs, ys):
+    np = load_numpy() if len(xs) >= NUMPY_MIN_POINTS else None
+    if np is not None:
+        xs = np.asarray(xs, dtype=np.float64)
+        ys = np.asarray(ys, dtype=np.float64)
+        sums = xs + ys
+        diffs = xs - ys
+        corners = [
+            int(np.argmax(xs)), int(np.argmax(sums)), int(np.argmax(ys)), int(np.argmin(diffs)),
+            int(np.argmin(xs)), int(np.argmin(sums)), int(np.argmin(ys)), int(np.argmax(diffs)),
+        ]
+    else:
+        indices = range(len(xs))
+        corners = [
+            max(indices, key=lambda i: xs[i]),
+            max(indices, key=lambda i: xs[i] + ys[i]),
+            max(indices, key=lambda i: ys[i]),
+            min(indices, key=lambda i: xs[i] - ys[i]),
+            min(indices, key=lambda i: xs[i]),
+            min(indices, key=lambda i: xs[i] + ys[i]),
+            min(indices, key=lambda i: ys[i]),
+            max(indices, key=lambda i: xs[i] - ys[i]),
+        ]
+
+    # neighbouring directions often share an extreme point
+    octagon = []
+    for corner in corners:
+        if octagon and (xs[corner], ys[corner]) == (xs[octagon[-1]], ys[octagon[-1]]):
+            continue
+        octagon.append(corner)
+    # and the last corner can wrap around onto the first
+    while len(octagon) > 1 and (xs[octagon[-1]], ys[octagon[-1]]) == (xs[octagon[0]], ys[octagon[0]]):
+        octagon.pop()
+    return octagon
+
+
+# Drop every point strictly inside the extreme point octagon.
+# returns (indices of the points that survive, number of points removed)
+def cull_interior(xs, ys):
+    n = len(xs)
+    if n < 4:
+        return list(range(n)), 0
+
+    octagon = extreme_octagon(xs, ys)
+    if len(octagon) < 3:
+        return list(range(n)), 0
+
+    edges = [(octagon[i], octagon[(i + 1) % len(octagon)]) for i in range(len(octagon))]
+
+    np = load_numpy() if n >= NUMPY_MIN_POINTS else None
+    if np is not None:
+        xs = np.asarray(xs, dtype=np.float64)
+        ys = np.asarray(ys, dtype=np.float64)
+        inside = np.ones(n, dtype=bool)
+        for a, b in edges:
+            ax, ay = xs[a], ys[a]
+            # certainly to the left of every counter-clockwise edge
+            first = (xs[b] - ax) * (ys - ay)
+            second = (ys[b] - ay) * (xs - ax)
+            inside &= first - second > ORIENTATION_ERROR * (np.abs(first) + np.abs(second))
+        kept = np.flatnonzero(~inside).tolist()
+    else:
+        lines = [(xs[a], ys[a], xs[b], ys[b]) for a, b in edges]
+        kept = []
+        for i in range(n):
+            x = xs[i]
+            y = ys[i]
+            for ax, ay, bx, by in lines:
+                if orientation(ax, ay, bx, by, x, y) <= 0:
+                    kept.append(i)
+                    break
+
+    return kept, n - len(kept)
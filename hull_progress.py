@@ -0,0 +1,64 @@
+import time
+
+from hull_engine import mixed_engine
+
+#
+# Progress reporting and cancellation for long solves.
+#
+# with_progress(engine_class) returns a subclass that counts merges and the
+# points the recursion has reached, reports them through a callback at most
+# every PROGRESS_INTERVAL seconds and stops the solve with SolveCancelled as
+# soon as is_cancelled() returns True.  Both are checked once per merge, so the
+# tangent walks themselves are untouched.
+#
+
+PROGRESS_INTERVAL = 0.05
+
+
+class SolveCancelled(Exception):
+    pass
+
+
+# Engine mixin: on_progress(merges_done, merges_total, points_remaining)
+class ProgressMixin:
+
+    def __init__(self, xs, ys, on_progress=None, is_cancelled=None):
+        super().__init__(xs, ys)
+        self.on_progress = on_progress
+        self.is_cancelled = is_cancelled
+        self.merges_done = 0
+        self.merges_total = 0
+        self.points_remaining = 0
+        self.last_report = 0.0
+
+    def sort_points(self, points):
+        self.check_cancelled()
+        order = super().sort_points(points)
+        self.merges_done = 0
+        self.merges_total = self.count_base_cases(len(order)) - 1 if len(order) > 1 else 0
+        self.points_remaining = len(order)
+        return order
+
+    def order_base_hull(self, points):
+        self.points_remaining -= len(points)
+        return super().order_base_hull(points)
+
+    def merge_two_hulls(self, left, right):
+        self.check_cancelled()
+        merged = super().merge_two_hulls(left, right)
+        self.merges_done += 1
+        now = time.monotonic()
+        if self.on_progress is not None and (now - self.last_report >= PROGRESS_INTERVAL
+                                             or self.merges_done == self.merges_total):
+            self.last_report = now
+            self.on_progress(self.merges_done, self.merges_total, self.points_remaining)
+        return merged
+
+    def check_cancelled(self):
+        if self.is_cancelled is not None and self.is_cancelled():
+            raise SolveCancelled()
+
+
+# The progress-reporting version of an engine class; built once per class
+def with_progress(engine_class):
+    return mixed_engine('Progress', ProgressMixin, engine_class)
@@ -0,0 +1,231 @@
+from bisect import bisect_left
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from hull_predicates import ORIENTATION_ERROR, cross, exact_orientation
+
+#
+# Queries against a finished hull in O(log h).
+#
+# HullIndex takes the hull vertices clockwise from the leftmost point, as the
+# engines and compute_hull produce them, and keeps them as an upper and a
+# lower chain sorted by (x, y) plus a counter-clockwise ring.  Point location
+# is a bisection on the chains, the extreme point in a direction a binary
+# search for the edge where the chain turns away from it, and the tangents
+# from an outside point a binary search around the ring.  contains_many and
+# extreme_many answer whole arrays of queries with NumPy.
+#
+
+
+class HullIndex:
+
+    # vertices is a sequence of (x, y) pairs clockwise from the leftmost point
+    def __init__(self, vertices):
+        vertices = [(float(x), float(y)) for x, y in vertices]
+        if not vertices:
+            raise ValueError('A hull needs at least one vertex')
+        self.vertices = vertices
+        rightmost = max(range(len(vertices)), key=vertices.__getitem__)
+        # both chains run from the leftmost to the rightmost point
+        self.upper = vertices[:rightmost + 1]
+        self.lower = vertices[:1] + vertices[:rightmost - 1:-1] if rightmost > 0 else vertices[:1]
+        self.ring = vertices[:1] + vertices[:0:-1]
+
+    # Build from an engine result: hull indices into xs/ys
+    @classmethod
+    def from_engine(cls, xs, ys, hull):
+        return cls((xs[i], ys[i]) for i in hull)
+
+    def __len__(self):
+        return len(self.vertices)
+
+    # True if (x, y) is inside or on the hull
+    def contains(self, x, y):
+        point = (x, y)
+        upper = self.upper
+        lower = self.lower
+        if point < upper[0] or point > upper[-1]:
+            return False
+        i = bisect_left(upper, point)
+        if upper[i] != point and cross(upper[i - 1], upper[i], point) > 0:
+            return False
+        i = bisect_left(lower, point)
+        return lower[i] == point or cross(lower[i - 1], lower[i], point) >= 0
+
+    # The vertex (x, y) farthest in direction (dx, dy); of several equally far
+    # ones, any.  Above the horizontal the answer is on the upper chain, below
+    # it on the lower one, and along either chain the edges first point with
+    # the direction and then against it.
+    def extreme(self, dx, dy):
+        if dy == 0:
+            if dx == 0:
+                raise ValueError('The direction must not be zero')
+            return self.upper[-1] if dx > 0 else self.upper[0]
+        chain = self.upper if dy > 0 else self.lower
+        # first edge that doesn't point with the direction
+        low = 0
+        high = len(chain) - 1
+        while low < high:
+            middle = (low + high) // 2
+            (ax, ay), (bx, by) = chain[middle], chain[middle + 1]
+            if (bx - ax) * dx + (by - ay) * dy <= 0:
+                high = middle
+            else:
+                low = middle + 1
+        return chain[low]
+
+    # The two vertices where the lines from (x, y) touch the hull, as
+    # (first, second) with the hull to the right of the line from the point
+    # through first and to the left of the one through second.
+    # returns None if the point is inside or on the hull
+    def tangents(self, x, y):
+        if self.contains(x, y):
+            return None
+        ring = self.ring
+        point = (x, y)
+        if len(ring) == 1:
+            return ring[0], ring[0]
+        return ring[self.ring_tangent(point, -1)], ring[self.ring_tangent(point, 1)]
+
+    # Binary search around the counter-clockwise ring for the vertex v whose
+    # neighbours both lie on the side of point -> v given by side (1 left,
+    # -1 right), for a point outside the hull
+    def ring_tangent(self, point, side):
+        ring = self.ring
+        n = len(ring)
+
+        # vertex j is behind vertex i seen from point when it lies on side of point -> i
+        def behind(i, j):
+            return cross(point, ring[i % n], ring[j % n]) * side < 0
+
+        def is_tangent(i):
+            return not behind(i, i + 1) and not behind(i, i - 1)
+
+        if is_tangent(0):
+            return 0
+        low = 0
+        high = n
+        while high - low > 1:
+            middle = (low + high) // 2
+            if is_tangent(middle):
+                return middle % n
+            # which way the ring is heading at both ends, seen from point
+            low_forward = behind(low, low + 1)
+            middle_forward = behind(middle, middle + 1)
+            if low_forward:
+                if not middle_forward or behind(middle, low):
+                    high = middle
+                else:
+                    low = middle
+            else:
+                if middle_forward or not behind(low, middle):
+                    low = middle
+                else:
+                    high = middle
+        return low % n
+
+    # contains() for arrays of query coordinates; strict=True leaves out the
+    # points on the boundary.
+    # returns a NumPy bool array (a list of bools without NumPy)
+    def contains_many(self, xs, ys, strict=False):
+        if np is None:
+            if strict:
+                return [self.contains(x, y) and not self.on_boundary(x, y) for x, y in zip(xs, ys)]
+            return [self.contains(x, y) for x, y in zip(xs, ys)]
+        xs = np.asarray(xs, dtype=np.float64)
+        ys = np.asarray(ys, dtype=np.float64)
+        upper = np.array(self.upper)
+        lower = np.array(self.lower)
+        left = upper[0, 0]
+        right = upper[-1, 0]
+
+        inside = np.zeros(len(xs), dtype=bool)
+        # on the leftmost or rightmost vertical, between its lowest and highest
+        # vertex, which is all boundary
+        if not strict:
+            for edge_x in (left, right):
+                bottom, top = self.vertices_at(edge_x)
+                at = xs == edge_x
+                inside[at] = (ys[at] >= bottom) & (ys[at] <= top)
+
+        # strictly between them, under the upper chain and over the lower one
+        between = np.flatnonzero((xs > left) & (xs < right))
+        qx = xs[between]
+        qy = ys[between]
+        for chain, allowed in ((upper, -1), (lower, 1)):
+            i = np.searchsorted(chain[:, 0], qx, side='right')
+            turn = turns(chain[i - 1], chain[i], qx, qy)
+            ok = turn * allowed > 0 if strict else turn * allowed >= 0
+            between = between[ok]
+            qx = qx[ok]
+            qy = qy[ok]
+        inside[between] = True
+        return inside
+
+    # True if (x, y) lies on an edge or a vertex of the hull
+    def on_boundary(self, x, y):
+        point = (x, y)
+        vertices = self.vertices
+        if len(vertices) == 1:
+            return point == vertices[0]
+        for i in range(len(vertices)):
+            a = vertices[i - 1]
+            b = vertices[i]
+            if cross(a, b, point) == 0 and min(a, b) <= point <= max(a, b):
+                return True
+        return False
+
+    # lowest and highest y of the vertices with the given x
+    def vertices_at(self, x):
+        ys = [vy for vx, vy in self.vertices if vx == x]
+        return min(ys), max(ys)
+
+    # extreme() for arrays of directions.
+    # returns an (m, 2) NumPy array of vertices (a list of pairs without NumPy)
+    def extreme_many(self, dxs, dys):
+        if np is None:
+            return [self.extreme(dx, dy) for dx, dy in zip(dxs, dys)]
+        dxs = np.asarray(dxs, dtype=np.float64)
+        dys = np.asarray(dys, dtype=np.float64)
+        if np.any((dxs == 0) & (dys == 0)):
+            raise ValueError('The direction must not be zero')
+        result = np.empty((len(dxs), 2), dtype=np.float64)
+
+        for chain, chosen in ((self.upper, dys > 0), (self.lower, dys < 0)):
+            chain = np.array(chain)
+            dx = dxs[chosen]
+            dy = dys[chosen]
+            low = np.zeros(len(dx), dtype=np.int64)
+            high = np.full(len(dx), len(chain) - 1, dtype=np.int64)
+            edges = np.diff(chain, axis=0)
+            while True:
+                searching = low < high
+                if not np.any(searching):
+                    break
+                middle = (low + high) // 2
+                edge = edges[np.minimum(middle, len(edges) - 1)]
+                against = edge[:, 0] * dx + edge[:, 1] * dy <= 0
+                high = np.where(searching & against, middle, high)
+                low = np.where(searching & ~against, middle + 1, low)
+            result[chosen] = chain[low]
+
+        horizontal = dys == 0
+        result[horizontal & (dxs > 0)] = self.upper[-1]
+        result[horizontal & (dxs < 0)] = self.upper[0]
+        return result
+
+
+# Exact-sign orientation of the points (qx, qy) against the segments a -> b,
+# all given as arrays: the float determinant where the filter of
+# hull_predicates trusts it, the exact sign for the rest
+def turns(a, b, qx, qy):
+    first = (b[:, 0] - a[:, 0]) * (qy - a[:, 1])
+    second = (b[:, 1] - a[:, 1]) * (qx - a[:, 0])
+    turn = first - second
+    unsure = np.flatnonzero(np.abs(turn) <= ORIENTATION_ERROR * (np.abs(first) + np.abs(second)))
+    for i in unsure.tolist():
+        turn[i] = exact_orientation(a[i, 0], a[i, 1], b[i, 0], b[i, 1], qx[i], qy[i])
+    return turn
@@ -0,0 +1,117 @@
+from collections import namedtuple
+from functools import lru_cache
+from itertools import islice
+from operator import eq, le
+
+#
+# The x-sort every solve starts with.
+#
+# sort_by_x works on the raw coordinates and picks its method by the size and
+# the state of the input:
+#   'sorted'  the points are in x-order already, which one pass checks: no sort
+#   'python'  fewer than NUMPY_MIN_POINTS points, or no NumPy: Python's sort on
+#             an index key, which is timsort and adapts to sorted runs anyway
+#   'stable'  nearly sorted, at most one descent per NEARLY_SORTED_RUN points:
+#             NumPy's stable sort, also timsort
+#   'quick'   anything else: NumPy's default argsort on the float64 keys
+# Handing it the x-order of an earlier solve as the starting order makes a
+# repeated solve of the same points a 'sorted' one, and one of slightly moved
+# points a 'stable' one.
+#
+# NumPy is imported on first use, not with the module: a command-line run on
+# a small file never loads it.
+#
+
+# below this many points Python's sort beats copying the keys into NumPy
+NUMPY_MIN_POINTS = 1024
+
+# one descent per this many points still counts as nearly sorted
+NEARLY_SORTED_RUN = 1024
+
+# order is the indices sorted by x, method one of the names above and ties
+# whether any two of the points share an x-value
+XOrder = namedtuple('XOrder', 'order method ties')
+
+
+# NumPy, or None when it isn't installed
+@lru_cache(maxsize=None)
+def load_numpy():
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+# Sort the indices points (a sequence of indices into xs) by x.  Points with
+# equal x-values come in no particular order.
+# returns an XOrder
+def sort_by_x(xs, points):
+    n = len(points)
+    np = load_numpy() if n >= NUMPY_MIN_POINTS else None
+    if np is None:
+        keys = list(map(xs.__getitem__, points))
+        if all(map(le, keys, islice(keys, 1, None))):
+            order = list(points)
+            method = 'sorted'
+        else:
+            order = sorted(points, key=xs.__getitem__)
+            keys = list(map(xs.__getitem__, order))
+            method = 'python'
+        return XOrder(order, method, any(map(eq, keys, islice(keys, 1, None))))
+
+    indices, keys = gather(xs, points)
+    descents = np.count_nonzero(keys[1:] < keys[:-1])
+    if descents == 0:
+        return XOrder(list(points), 'sorted', bool(np.any(keys[1:] == keys[:-1])))
+    if descents <= n // NEARLY_SORTED_RUN:
+        permutation = np.argsort(keys, kind='stable')
+        method = 'stable'
+    else:
+        permutation = np.argsort(keys)
+        method = 'quick'
+    keys = keys[permutation]
+    order = permutation if indices is None else indices[permutation]
+    return XOrder(order.tolist(), method, bool(np.any(keys[1:] == keys[:-1])))
+
+
+# The indices as an array (None when they are all of xs in order) and their x-values
+def gather(xs, points):
+    np = load_numpy()
+    if isinstance(points, range) and points == range(len(xs)):
+        return None, np.asarray(xs, dtype=np.float64)
+    indices = np.array(points, dtype=np.int64)
+    # copying all of xs and indexing that beats looking up a large share one by one
+    if 4 * len(points) >= len(xs):
+        return indices, np.asarray(xs, dtype=np.float64)[indices]
+    return indices, np.fromiter(map(xs.__getitem__, points), dtype=np.float64, count=len(points))
+
+
+# Sort the indices points by (x, y), keeping only the lowest index of any
+# equal points
+def sort_unique(xs, ys, points):
+    np = load_numpy() if len(points) >= NUMPY_MIN_POINTS else None
+    if np is None:
+        order = sorted(points)
+        order.sort(key=ys.__getitem__)
+        order.sort(key=xs.__getitem__)
+        unique = []
+        previous = None
+        for i in order:
+            if previous is not None and xs[i] == xs[previous] and ys[i] == ys[previous]:
+                continue
+            unique.append(i)
+            previous = i
+        return unique
+
+    indices, x = gather(xs, points)
+    y = gather(ys, points)[1]
+    if indices is None:
+        indices = np.arange(len(xs))
+    # lexsort sorts by the last key first
+    permutation = np.lexsort((indices, y, x))
+    x = x[permutation]
+    y = y[permutation]
+    first = np.ones(len(permutation), dtype=bool)
+    first[1:] = (x[1:] != x[:-1]) | (y[1:] != y[:-1])
+    return indices[permutation[first]].tolist()
@@ -0,0 +1,149 @@
+from collections import namedtuple
+import time
+
+from hull_engine import BottomUpEngine, mixed_engine
+
+#
+# Opt-in instrumentation for the hull engines.
+#
+# instrumented(engine_class) returns a subclass that counts and times the hot
+# paths into a HullStats object.  The plain engines are left untouched, so a
+# solve without instrumentation pays nothing for it.
+#
+
+# What on_merge callbacks get after every merge: the recursion depth of the
+# merge (for BottomUpEngine, which has no recursion, the stack level of the
+# merged hull, 1 for two base hulls), the sizes of the two hulls and the
+# steps the two tangent walks took
+MergeEvent = namedtuple('MergeEvent', 'depth left_size right_size upper_steps lower_steps')
+
+
+class HullStats:
+
+    def __init__(self):
+        # orientation tests (orientation, turns_left and turns_right)
+        self.orientation_calls = 0
+        # iterations of the inner walk loops of find_upper_tangent / find_lower_tangent
+        self.upper_tangent_steps = 0
+        self.lower_tangent_steps = 0
+        # tangent queries of the Chan engine's gift wrap
+        self.group_tangent_queries = 0
+        self.merges = 0
+        # deepest level convex_hull_solver reached, the top call being 1; for
+        # BottomUpEngine the highest stack level a merge reached
+        self.max_depth = 0
+        # time spent in sort_points, tangent searches, combineHullsWithTangents
+        # and order_base_hull (the canonical ordering that replaced sort_hull)
+        self.sort_seconds = 0.0
+        self.tangent_seconds = 0.0
+        self.combine_seconds = 0.0
+        self.base_order_seconds = 0.0
+
+    def as_dict(self):
+        return dict(vars(self))
+
+    def __repr__(self):
+        return 'HullStats({})'.format(', '.join('{}={!r}'.format(k, v) for k, v in vars(self).items()))
+
+
+# Engine mixin that fills self.stats.  on_merge, if given, is called as
+# on_merge(stats, event) with a MergeEvent after every merge, e.g. to flag
+# tangent walks that spin on pathological inputs.
+class StatsMixin:
+
+    def __init__(self, xs, ys, on_merge=None):
+        super().__init__(xs, ys)
+        self.stats = HullStats()
+        self.on_merge = on_merge
+        self.depth = 0
+
+    def orientation(self, a, b, c):
+        self.stats.orientation_calls += 1
+        return super().orientation(a, b, c)
+
+    def turns_left(self, a, b, c):
+        self.stats.orientation_calls += 1
+        return super().turns_left(a, b, c)
+
+    def turns_right(self, a, b, c):
+        self.stats.orientation_calls += 1
+        return super().turns_right(a, b, c)
+
+    def sort_points(self, points):
+        t1 = time.perf_counter()
+        order = super().sort_points(points)
+        self.stats.sort_seconds += time.perf_counter() - t1
+        return order
+
+    def convex_hull_solver(self, points, start=0, end=None):
+        self.depth += 1
+        if self.depth > self.stats.max_depth:
+            self.stats.max_depth = self.depth
+        try:
+            return super().convex_hull_solver(points, start, end)
+        finally:
+            self.depth -= 1
+
+    def order_base_hull(self, points):
+        t1 = time.perf_counter()
+        hull = super().order_base_hull(points)
+        self.stats.base_order_seconds += time.perf_counter() - t1
+        return hull
+
+    def merge_two_hulls(self, left, right):
+        stats = self.stats
+        stats.merges += 1
+        upper_before = stats.upper_tangent_steps
+        lower_before = stats.lower_tangent_steps
+        depth = self.stack_level if isinstance(self, BottomUpEngine) else self.depth
+        if depth > stats.max_depth:
+            stats.max_depth = depth
+        # the merge grows the left hull's list in place
+        left_size = len(left[0])
+        merged = super().merge_two_hulls(left, right)
+        if self.on_merge is not None:
+            self.on_merge(stats, MergeEvent(
+                depth,
+                left_size,
+                len(right[0]),
+                stats.upper_tangent_steps - upper_before,
+                stats.lower_tangent_steps - lower_before,
+            ))
+        return merged
+
+    # every walk iteration is one orientation test
+    def find_upper_tangent(self, left_hull, right_hull, rightmost_of_left):
+        stats = self.stats
+        tests_before = stats.orientation_calls
+        t1 = time.perf_counter()
+        tangent = super().find_upper_tangent(left_hull, right_hull, rightmost_of_left)
+        stats.tangent_seconds += time.perf_counter() - t1
+        stats.upper_tangent_steps += stats.orientation_calls - tests_before
+        return tangent
+
+    def find_lower_tangent(self, left_hull, right_hull, rightmost_of_left):
+        stats = self.stats
+        tests_before = stats.orientation_calls
+        t1 = time.perf_counter()
+        tangent = super().find_lower_tangent(left_hull, right_hull, rightmost_of_left)
+        stats.tangent_seconds += time.perf_counter() - t1
+        stats.lower_tangent_steps += stats.orientation_calls - tests_before
+        return tangent
+
+    def find_group_tangent(self, point, group_hull, k):
+        self.stats.group_tangent_queries += 1
+        t1 = time.perf_counter()
+        k = super().find_group_tangent(point, group_hull, k)
+        self.stats.tangent_seconds += time.perf_counter() - t1
+        return k
+
+    def combineHullsWithTangents(self, *args):
+        t1 = time.perf_counter()
+        combined = super().combineHullsWithTangents(*args)
+        self.stats.combine_seconds += time.perf_counter() - t1
+        return combined
+
+
+# The instrumented version of an engine class; built once per class
+def instrumented(engine_class):
+    return mixed_engine('Instrumented', StatsMixin, engine_class)
@@ -0,0 +1,121 @@
+from array import array
+from heapq import merge
+import struct
+import sys
+
+from engines import ENGINES
+from hull_predicates import cross
+
+#
+# Union of convex hulls that may overlap.
+#
+# merge_two_hulls only joins hulls that are separated in x, as they are in the
+# divide-and-conquer.  Here hulls are vertex lists sorted by (x, y); any number
+# of them are combined by merging the lists and re-running a monotone chain
+# over the result, which is linear in the hull sizes for two hulls and
+# O(H log k) for k hulls of H vertices in all.
+#
+# For sharded hulling every shard reduces its points to a summary, its hull
+# packed as bytes (pack_hull), and summaries are merged in any order or
+# grouping, since the hull of a union doesn't depend on either.  A summary is
+# a 16-byte header followed by the vertices clockwise from the leftmost point
+# as little-endian float64 pairs, so it is as large as the hull, not the shard.
+#
+
+# magic, format version, vertex count
+SUMMARY_HEADER = struct.Struct('<4sIQ')
+SUMMARY_MAGIC = b'HULL'
+SUMMARY_VERSION = 1
+
+
+# Combine hulls given as vertex lists sorted by (x, y).
+# returns the hull of their union in the same form
+def union_hulls(hulls):
+    upper = []
+    lower = []
+    previous = None
+    for point in merge(*hulls):
+        if point == previous:
+            continue
+        previous = point
+        while len(upper) >= 2 and cross(upper[-2], upper[-1], point) >= 0:
+            upper.pop()
+        upper.append(point)
+        while len(lower) >= 2 and cross(lower[-2], lower[-1], point) <= 0:
+            lower.pop()
+        lower.append(point)
+    return list(merge(upper, lower[1:-1]))
+
+
+# Combine two hulls given as vertex lists sorted by (x, y)
+def combine_hulls(a, b):
+    return union_hulls((a, b))
+
+
+# Clockwise vertex list, starting at the leftmost point, of a hull given as
+# a vertex list sorted by (x, y)
+def clockwise_vertices(hull):
+    if len(hull) < 3:
+        return list(hull)
+    first = hull[0]
+    last = hull[-1]
+    upper = [first]
+    lower = []
+    for point in hull[1:-1]:
+        if cross(first, last, point) > 0:
+            upper.append(point)
+        else:
+            lower.append(point)
+    upper.append(last)
+    return upper + lower[::-1]
+
+
+# Vertex list sorted by (x, y) of a hull given clockwise from the leftmost
+# point, as the engines return it: the upper chain up to the rightmost vertex
+# is sorted already and the rest is sorted backwards, so this is one merge
+def sorted_vertices(hull):
+    if len(hull) < 3:
+        return sorted(hull)
+    rightmost = max(range(len(hull)), key=hull.__getitem__)
+    return list(merge(hull[:rightmost + 1], hull[:rightmost:-1]))
+
+
+# Pack a hull, vertices clockwise from the leftmost point, into a summary
+def pack_hull(vertices):
+    values = array('d')
+    for x, y in vertices:
+        values.append(x)
+        values.append(y)
+    if sys.byteorder != 'little':
+        values.byteswap()
+    return SUMMARY_HEADER.pack(SUMMARY_MAGIC, SUMMARY_VERSION, len(vertices)) + values.tobytes()
+
+
+# The vertices, clockwise from the leftmost point, of a summary
+def unpack_hull(data):
+    if len(data) < SUMMARY_HEADER.size:
+        raise ValueError('Hull summary is truncated')
+    magic, version, count = SUMMARY_HEADER.unpack_from(data)
+    if magic != SUMMARY_MAGIC or version != SUMMARY_VERSION:
+        raise ValueError('Not a version {} hull summary'.format(SUMMARY_VERSION))
+    if len(data) != SUMMARY_HEADER.size + 16 * count:
+        raise ValueError('Hull summary should hold {} vertices, got {} bytes'.format(count, len(data)))
+    values = array('d')
+    values.frombytes(memoryview(data)[SUMMARY_HEADER.size:])
+    if sys.byteorder != 'little':
+        values.byteswap()
+    values = values.tolist()
+    return list(zip(values[0::2], values[1::2]))
+
+
+# The summary of one shard of points.  engine, workers and cull are passed on
+# to the engine (engines.ENGINES).
+def hull_summary(xs, ys, engine='divide', workers=1, cull=False):
+    hull = ENGINES[engine](xs, ys).compute(workers, cull)
+    return pack_hull([(xs[i], ys[i]) for i in hull])
+
+
+# Merge any number of summaries into the summary of their union
+def merge_summaries(summaries):
+    hulls = [sorted_vertices(unpack_hull(data)) for data in summaries]
+    return pack_hull(clockwise_vertices(union_hulls(hulls)))
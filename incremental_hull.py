@@ -0,0 +1,99 @@
+from bisect import bisect_left
+
+from hull_predicates import cross
+
+#
+# Incremental convex hull: insert points one at a time without re-hulling.
+#
+# The hull is kept as its upper and lower chains, each a list of (x, y) tuples
+# sorted from the leftmost to the rightmost point.  Inserting a point is a
+# binary search on both chains (which also rejects points already inside the
+# hull), then a walk outwards from the new point that drops the neighbours it
+# hides - the same walk find_upper_tangent and find_lower_tangent do, stopping
+# at the two tangents from the new point.  Every point is removed at most once,
+# so apart from the list splice an insert costs amortized O(log h).
+#
+
+
+class IncrementalHull:
+
+    # vertices is any sequence of (x, y) pairs, usually an existing hull
+    def __init__(self, vertices=()):
+        self.upper = []
+        self.lower = []
+        for x, y in vertices:
+            self.insert(x, y)
+
+    # Build from an engine result: hull indices into xs/ys
+    @classmethod
+    def from_engine(cls, xs, ys, hull):
+        return cls((xs[i], ys[i]) for i in hull)
+
+    # Build from points with x() and y() methods, such as the QPointF's
+    # ConvexHullSolver.compute_hull returns
+    @classmethod
+    def from_points(cls, points):
+        return cls((point.x(), point.y()) for point in points)
+
+    def __len__(self):
+        return len(self.vertices())
+
+    # current hull vertices, clockwise starting at the leftmost point
+    def vertices(self):
+        return self.upper + self.lower[-2:0:-1]
+
+    # True if (x, y) is inside or on the hull, O(log h)
+    def contains(self, x, y):
+        upper = self.upper
+        if not upper:
+            return False
+        point = (x, y)
+        if point < upper[0] or point > upper[-1]:
+            return False
+        return self.under_upper(point) and self.over_lower(point)
+
+    def under_upper(self, point):
+        upper = self.upper
+        i = bisect_left(upper, point)
+        if i == len(upper):
+            return False
+        if upper[i] == point:
+            return True
+        return i > 0 and cross(upper[i - 1], upper[i], point) <= 0
+
+    def over_lower(self, point):
+        lower = self.lower
+        i = bisect_left(lower, point)
+        if i == len(lower):
+            return False
+        if lower[i] == point:
+            return True
+        return i > 0 and cross(lower[i - 1], lower[i], point) >= 0
+
+    # Add a point to the hull.
+    # returns False if it was already inside the hull, True if the hull changed
+    def insert(self, x, y):
+        if self.contains(x, y):
+            return False
+        point = (x, y)
+        if not self.under_upper(point):
+            self.splice(self.upper, point, -1)
+        if not self.over_lower(point):
+            self.splice(self.lower, point, 1)
+        return True
+
+    # Put point into a chain and drop the vertices between it and its two
+    # tangents.  turn is -1 for the upper chain (which must only turn right,
+    # i.e. clockwise) and 1 for the lower chain.
+    def splice(self, chain, point, turn):
+        i = bisect_left(chain, point)
+        chain.insert(i, point)
+
+        # walk right until the tangent on that side
+        while i + 2 < len(chain) and cross(point, chain[i + 1], chain[i + 2]) * turn <= 0:
+            del chain[i + 1]
+
+        # walk left until the tangent on that side
+        while i >= 2 and cross(chain[i - 2], chain[i - 1], point) * turn <= 0:
+            del chain[i - 1]
+            i -= 1
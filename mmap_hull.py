@@ -0,0 +1,101 @@
+from array import array
+from collections import namedtuple
+import mmap
+import os
+import sys
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+from engines import ENGINES
+from hull_union import combine_hulls, clockwise_vertices, sorted_vertices
+
+#
+# Out-of-core hulling of point files.
+#
+# A point file is a flat binary run of native float64 values, x0 y0 x1 y1 ...
+# (what array('d').tofile or numpy's tofile write).  The file is memory-mapped
+# and hulled one fixed-size chunk at a time; each chunk hull is folded into a
+# running hull with hull_union.combine_hulls, so only one chunk and two small
+# hulls are ever held in memory.
+#
+
+# vertices clockwise from the leftmost point, the number of points read, the
+# number of chunks and the peak resident set size of the process in bytes
+# (None where the platform can't report it)
+FileHull = namedtuple('FileHull', 'vertices points chunks peak_rss')
+
+DEFAULT_CHUNK_POINTS = 1 << 20
+
+
+# peak resident set size of this process in bytes, or None
+def peak_rss():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    if sys.platform == 'darwin':
+        return peak
+    return peak * 1024
+
+
+# Write xs/ys as a point file that hull_file can read
+def write_points(path, xs, ys, chunk_points=DEFAULT_CHUNK_POINTS):
+    with open(path, 'wb') as f:
+        for start in range(0, len(xs), chunk_points):
+            chunk = array('d')
+            for x, y in zip(xs[start:start + chunk_points], ys[start:start + chunk_points]):
+                chunk.append(x)
+                chunk.append(y)
+            chunk.tofile(f)
+
+
+# Hull a point file without loading it.  engine and cull are passed on to the
+# engine that hulls each chunk.  With a tolerance the chunks are streamed
+# through an approx_hull.ApproximateHull instead, which needs NumPy, and the
+# vertices are those of the approximation.
+# returns a FileHull
+def hull_file(path, chunk_points=DEFAULT_CHUNK_POINTS, engine='divide', cull=False, tolerance=None):
+    size = os.path.getsize(path)
+    if size % 16 != 0:
+        raise ValueError('{} is not a whole number of float64 (x, y) pairs'.format(path))
+    npoints = size // 16
+    if npoints == 0:
+        return FileHull([], 0, 0, peak_rss())
+
+    approximate = None
+    if tolerance is not None:
+        from approx_hull import ApproximateHull
+        approximate = ApproximateHull(tolerance)
+
+    hull = []
+    chunks = 0
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        values = memoryview(mapped).cast('d')
+        try:
+            for start in range(0, npoints, chunk_points):
+                end = min(start + chunk_points, npoints)
+                if approximate is not None:
+                    # NumPy reads the mapped values in place
+                    chunk = values[2 * start:2 * end]
+                    approximate.add(chunk[0::2], chunk[1::2])
+                    chunk.release()
+                    chunks += 1
+                    continue
+
+                chunk = values[2 * start:2 * end].tolist()
+                xs = chunk[0::2]
+                ys = chunk[1::2]
+                del chunk
+
+                chunk_hull = ENGINES[engine](xs, ys).compute(1, cull)
+                hull = combine_hulls(hull, sorted_vertices([(xs[i], ys[i]) for i in chunk_hull]))
+                chunks += 1
+        finally:
+            values.release()
+
+    if approximate is not None:
+        return FileHull(approximate.result().vertices, npoints, chunks, peak_rss())
+    return FileHull(clockwise_vertices(hull), npoints, chunks, peak_rss())
@@ -0,0 +1,55 @@
+import numpy as np
+
+#
+# Vectorized generator for the point distributions of Proj2GUI.newPoints.
+#
+# Points are drawn in batches with NumPy and rejection sampled as whole
+# arrays.  The result is an Nx2 float64 array, and a given (distribution,
+# npoints, seed) always produces the same points, so the GUI and the
+# benchmarks can share inputs.
+#
+
+DISTRIBUTIONS = ('uniform', 'spherical', 'gaussian')
+
+# points are kept inside a disc (or ball) of this radius
+MAX_R = 0.98
+
+# fraction of draws each distribution accepts, used to size the batches
+ACCEPTANCE = {
+    'uniform': np.pi * MAX_R**2 / 4.0,
+    'spherical': 4.0 / 3.0 * np.pi * MAX_R**3 / 8.0,
+    'gaussian': 1.0 - np.exp(-MAX_R**2 / (2 * 0.25**2)),
+}
+
+
+# One batch of accepted candidates: 'uniform' in the disc of radius MAX_R,
+# 'spherical' the x/y of points in the ball of radius MAX_R, 'gaussian' with
+# sigma 0.25 clipped to the disc
+def draw_batch(rng, distribution, size):
+    if distribution == 'uniform':
+        xy = rng.uniform(-1.0, 1.0, size=(size, 2))
+        inside = (xy**2).sum(axis=1) <= MAX_R**2
+    elif distribution == 'spherical':
+        xyz = rng.uniform(-1.0, 1.0, size=(size, 3))
+        inside = (xyz**2).sum(axis=1) <= MAX_R**2
+        xy = xyz[:, :2]
+    elif distribution == 'gaussian':
+        xy = rng.normal(0.0, 0.25, size=(size, 2))
+        inside = (xy**2).sum(axis=1) <= MAX_R**2
+    else:
+        raise ValueError('Unknown distribution: {}'.format(distribution))
+    return xy[inside]
+
+
+# Generate npoints points as an (npoints, 2) float64 array.
+# seed=None draws fresh entropy from the OS.
+def generate_points(distribution, npoints, seed=None):
+    if distribution not in ACCEPTANCE:
+        raise ValueError('Unknown distribution: {}'.format(distribution))
+    rng = np.random.default_rng(seed)
+    points = np.empty((0, 2), dtype=np.float64)
+    while len(points) < npoints:
+        missing = npoints - len(points)
+        batch = draw_batch(rng, distribution, int(missing / ACCEPTANCE[distribution] * 1.05) + 16)
+        points = np.concatenate((points, batch))
+    return np.ascontiguousarray(points[:npoints])
@@ -0,0 +1,190 @@
+from contextlib import contextmanager
+from fractions import Fraction
+import math
+import random
+import unittest
+from unittest import mock
+
+import numpy as np
+
+import hull_engine
+import hull_prefilter
+import hull_sort
+from engines import ENGINES
+from hull_batch import hull_batch
+from hull_engine import HullEngine
+from hull_union import hull_summary, unpack_hull
+
+#
+# Every engine against a reference hull, with and without culling.
+#
+# The reference is a monotone chain in exact rational arithmetic, so it can't
+# be fooled by rounding.  Its hull is the engines' canonical one: the
+# vertices clockwise from the lowest of the leftmost points, no collinear
+# points, and the lowest index of any equal points.  The inputs are the ones
+# that break float predicates: grids, columns of equal x, collinear points
+# and points a few ulps off a line.  Inputs of NUMPY_MIN_POINTS points or more
+# go through the NumPy sort and cull, and every test also runs with NumPy
+# hidden, for the pure-Python paths.
+#
+#   python -m unittest test_hull_engines
+#
+
+SEED = 20
+
+
+# > 0 if c lies to the left of a -> b, exactly
+def exact_turn(a, b, c):
+    ax, ay = Fraction(a[0]), Fraction(a[1])
+    return (Fraction(b[0]) - ax) * (Fraction(c[1]) - ay) - (Fraction(b[1]) - ay) * (Fraction(c[0]) - ax)
+
+
+def reference_hull(xs, ys):
+    order = sorted(range(len(xs)), key=lambda i: (xs[i], ys[i], i))
+    points = []
+    for i in order:
+        if points and (xs[i], ys[i]) == (xs[points[-1]], ys[points[-1]]):
+            continue
+        points.append(i)
+    if len(points) < 3:
+        return points
+
+    # upper chain left to right, turning right only, then the lower chain back
+    def chain(indices):
+        kept = []
+        for i in indices:
+            while len(kept) >= 2 and exact_turn((xs[kept[-2]], ys[kept[-2]]), (xs[kept[-1]], ys[kept[-1]]),
+                                                (xs[i], ys[i])) >= 0:
+                kept.pop()
+            kept.append(i)
+        return kept
+
+    upper = chain(points)
+    lower = chain(reversed(points))
+    return upper + lower[1:-1]
+
+
+def grid(n, step):
+    return [i * step for i in range(n) for j in range(n)], [j * step for i in range(n) for j in range(n)]
+
+
+def columns(rng, n, count):
+    xs = [rng.choice(range(count)) * 0.7 for i in range(n)]
+    return xs, [rng.uniform(-1, 1) for i in range(n)]
+
+
+def collinear(rng, n):
+    slope = rng.uniform(-3, 3)
+    xs = [rng.uniform(-100, 100) for i in range(n)]
+    return xs, [slope * x for x in xs]
+
+
+# a triangle with one side on y = slope * x, and points just above that side
+def nudged(rng):
+    width = rng.uniform(1, 1000)
+    slope = rng.uniform(0.1, 3)
+    xs = [0.0, width, width / 2]
+    ys = [0.0, slope * width, -width]
+    for i in range(rng.randint(1, 6)):
+        x = rng.uniform(0, width)
+        y = slope * x
+        for j in range(rng.randint(1, 4)):
+            y = math.nextafter(y, math.inf)
+        xs.append(x)
+        ys.append(y)
+    return xs, ys
+
+
+def inputs():
+    rng = random.Random(SEED)
+    cases = [
+        ('grid', grid(40, 1.0)),
+        ('scaled grid', grid(40, 0.1)),
+        ('small grid', grid(5, 0.3)),
+        ('columns', columns(rng, 2000, 5)),
+        ('few columns', columns(rng, 50, 2)),
+        ('collinear', collinear(rng, 1500)),
+        ('short collinear', collinear(rng, 20)),
+        ('vertical', ([0.5] * 30, [rng.uniform(0, 1) for i in range(30)])),
+        ('duplicates', ([0.0, 1.0, 1.0, 0.0, 0.5, 1.0, 0.0] * 3, [0.0, 0.0, 1.0, 1.0, 0.5, 1.0, 0.0] * 3)),
+        ('single', ([2.0], [3.0])),
+        ('circle', ([math.cos(2 * math.pi * i / 1200) for i in range(1200)],
+                    [math.sin(2 * math.pi * i / 1200) for i in range(1200)])),
+        ('uniform', ([rng.random() for i in range(3000)], [rng.random() for i in range(3000)])),
+    ]
+    cases += [('nudged {}'.format(i), nudged(rng)) for i in range(300)]
+    # collinear points whose differences round: the "farther along the
+    # line" tie-break has to compare the coordinates themselves
+    cases += [
+        ('rounded beyond', ([-1e8, 1.0, 1 + 2 ** -30, 0.0], [-1e8, 1.0, 1 + 2 ** -30, 5.0])),
+        ('rounded farther', ([1 + 2 ** -30, 1 + 3 * 2 ** -30, 1.0, 2.0, -1e8],
+                             [1 + 2 ** -30, 1 + 3 * 2 ** -30, 1.0, -1.0, -1e8])),
+    ]
+    # large enough for the NumPy paths, with the nudged points in the middle
+    xs, ys = nudged(rng)
+    cases.append(('nudged large', (xs + [rng.uniform(0.4, 0.6) * xs[1] for i in range(2000)],
+                                   ys + [0.0] * 2000)))
+    return cases
+
+
+class EngineTest(unittest.TestCase):
+
+    def check_engines(self):
+        for name, (xs, ys) in inputs():
+            expected = reference_hull(xs, ys)
+            for engine, engine_class in ENGINES.items():
+                for cull in (False, True):
+                    with self.subTest(input=name, engine=engine, cull=cull):
+                        self.assertEqual(engine_class(xs, ys).compute(cull=cull), expected)
+
+    def test_engines(self):
+        self.check_engines()
+
+    def test_engines_without_numpy(self):
+        with hidden_numpy():
+            self.check_engines()
+
+    def test_workers(self):
+        # chunks this small send every input of 32 points or more through the
+        # process pool, and the spy checks that they really went
+        solver = HullEngine.parallel_solver
+        with mock.patch.object(hull_engine, 'PARALLEL_MIN_CHUNK', 16), \
+                mock.patch.object(HullEngine, 'parallel_solver', autospec=True, side_effect=solver) as spy:
+            for name, (xs, ys) in inputs()[:12]:
+                for engine in ('divide', 'bottomup'):
+                    for cull in (False, True):
+                        with self.subTest(input=name, engine=engine, cull=cull):
+                            self.assertEqual(ENGINES[engine](xs, ys).compute(workers=4, cull=cull),
+                                             reference_hull(xs, ys))
+        self.assertGreater(spy.call_count, 0)
+
+    def test_batch(self):
+        # more than 3 points, all of them the same: nothing to cull
+        cases = inputs() + [('all equal', ([1.0] * 5, [2.0] * 5))]
+        coords = np.concatenate([np.column_stack([xs, ys]).reshape(-1, 2) for name, (xs, ys) in cases])
+        offsets = np.cumsum([0] + [len(xs) for name, (xs, ys) in cases])
+        for cull in (False, True):
+            hulls = hull_batch(coords, offsets, cull)
+            for k, (name, (xs, ys)) in enumerate(cases):
+                with self.subTest(input=name, cull=cull):
+                    hull = hulls.indices[hulls.offsets[k]:hulls.offsets[k + 1]] - offsets[k]
+                    self.assertEqual(hull.tolist(), reference_hull(xs, ys))
+
+    def test_summary(self):
+        for name, (xs, ys) in inputs():
+            expected = [(xs[i], ys[i]) for i in reference_hull(xs, ys)]
+            for cull in (False, True):
+                with self.subTest(input=name, cull=cull):
+                    self.assertEqual(unpack_hull(hull_summary(xs, ys, cull=cull)), expected)
+
+
+# the pure-Python sort and cull, as without NumPy installed
+@contextmanager
+def hidden_numpy():
+    with mock.patch.object(hull_sort, 'load_numpy', lambda: None), \
+            mock.patch.object(hull_prefilter, 'load_numpy', lambda: None):
+        yield
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,325 @@
+from fractions import Fraction
+import math
+import random
+import unittest
+from unittest import mock
+
+from approx_hull import ApproximateHull, approximate_hull, directions_for
+import hull_query
+from hull_query import HullIndex
+from engines import ENGINES
+from hull_union import (clockwise_vertices, hull_summary, merge_summaries, pack_hull, sorted_vertices,
+                        union_hulls, unpack_hull)
+from test_hull_engines import exact_turn, grid, inputs, reference_hull
+from warm_hull import WarmHull
+
+#
+# The modules built on top of the engines, against brute force.
+#
+# Hulls come from the exact reference of test_hull_engines, and every answer
+# is checked with exact arithmetic over all the vertices (or all the points),
+# so the checks don't share a shortcut with the code they check.
+#
+#   python -m unittest test_hull_tools
+#
+
+SEED = 21
+
+
+# hulls, as clockwise vertex lists, of a few kinds of point sets, including a
+# single point, a segment and integer coordinates with boundary hits
+def sample_hulls():
+    rng = random.Random(SEED)
+    sets = [
+        ([rng.random() for i in range(200)], [rng.random() for i in range(200)]),
+        ([rng.randint(-6, 6) for i in range(60)], [rng.randint(-6, 6) for i in range(60)]),
+        ([math.cos(i / 7) for i in range(44)], [math.sin(i / 7) for i in range(44)]),
+        ([0.0, 1.0, 1.0, 0.0], [0.0, 0.0, 1.0, 1.0]),
+        ([2.0, 5.0], [1.0, 3.0]),
+        ([1.0, 1.0], [-2.0, 4.0]),
+        ([3.0], [3.0]),
+    ]
+    hulls = []
+    for xs, ys in sets:
+        xs = [float(x) for x in xs]
+        ys = [float(y) for y in ys]
+        hulls.append([(xs[i], ys[i]) for i in reference_hull(xs, ys)])
+    return hulls
+
+
+# query points around a hull: random ones, the vertices, edge midpoints and
+# points a few ulps off the vertices
+def query_points(vertices, rng):
+    xs = [x for x, y in vertices]
+    ys = [y for x, y in vertices]
+    low_x, high_x = min(xs) - 1, max(xs) + 1
+    low_y, high_y = min(ys) - 1, max(ys) + 1
+    points = [(rng.uniform(low_x, high_x), rng.uniform(low_y, high_y)) for i in range(150)]
+    points += [(float(rng.randint(-7, 7)), float(rng.randint(-7, 7))) for i in range(50)]
+    points += list(vertices)
+    points += [((ax + bx) / 2, (ay + by) / 2) for (ax, ay), (bx, by) in zip(vertices, vertices[1:] + vertices[:1])]
+    for x, y in vertices:
+        for dx in (-math.inf, math.inf):
+            for dy in (-math.inf, math.inf):
+                points.append((math.nextafter(x, dx), math.nextafter(y, dy)))
+    return points
+
+
+# (inside or on the hull, on its boundary), exactly
+def brute_location(vertices, point):
+    if len(vertices) == 1:
+        return point == vertices[0], point == vertices[0]
+    edges = list(zip(vertices, vertices[1:] + vertices[:1]))
+    on = any(exact_turn(a, b, point) == 0 and min(a, b) <= point <= max(a, b) for a, b in edges)
+    if len(vertices) == 2:
+        return on, on
+    # clockwise, so the inside is to the right of every edge
+    return on or all(exact_turn(a, b, point) < 0 for a, b in edges), on
+
+
+def dot(vertex, dx, dy):
+    return Fraction(vertex[0]) * Fraction(dx) + Fraction(vertex[1]) * Fraction(dy)
+
+
+class HullIndexTest(unittest.TestCase):
+
+    def check_contains(self):
+        rng = random.Random(SEED)
+        for vertices in sample_hulls():
+            index = HullIndex(vertices)
+            points = query_points(vertices, rng)
+            expected = [brute_location(vertices, point) for point in points]
+            inside = [location[0] for location in expected]
+            strict = [location[0] and not location[1] for location in expected]
+            with self.subTest(vertices=len(vertices)):
+                self.assertEqual([index.contains(x, y) for x, y in points], inside)
+                self.assertEqual([index.on_boundary(x, y) for x, y in points],
+                                 [location[1] for location in expected])
+                xs = [x for x, y in points]
+                ys = [y for x, y in points]
+                self.assertEqual(list(index.contains_many(xs, ys)), inside)
+                self.assertEqual(list(index.contains_many(xs, ys, strict=True)), strict)
+
+    def test_contains(self):
+        self.check_contains()
+
+    def test_contains_without_numpy(self):
+        with mock.patch.object(hull_query, 'np', None):
+            self.check_contains()
+
+    def test_extreme(self):
+        rng = random.Random(SEED)
+        directions = [(math.cos(a), math.sin(a)) for a in (rng.uniform(0, 2 * math.pi) for i in range(100))]
+        directions += [(1.0, 0.0), (-1.0, 0.0), (0.0, 1.0), (0.0, -1.0), (1.0, 1.0), (-1.0, 1.0)]
+        for vertices in sample_hulls():
+            index = HullIndex(vertices)
+            best = [max(dot(vertex, dx, dy) for vertex in vertices) for dx, dy in directions]
+            with self.subTest(vertices=len(vertices)):
+                found = [index.extreme(dx, dy) for dx, dy in directions]
+                self.assertEqual([dot(vertex, dx, dy) for vertex, (dx, dy) in zip(found, directions)], best)
+                self.assertTrue(all(vertex in vertices for vertex in found))
+                many = index.extreme_many([dx for dx, dy in directions], [dy for dx, dy in directions])
+                self.assertEqual([dot(tuple(vertex), dx, dy) for vertex, (dx, dy) in zip(many.tolist(), directions)],
+                                 best)
+
+    def test_tangents(self):
+        rng = random.Random(SEED)
+        for vertices in sample_hulls():
+            if len(vertices) < 3:
+                continue
+            index = HullIndex(vertices)
+            for point in query_points(vertices, rng):
+                tangents = index.tangents(*point)
+                with self.subTest(vertices=len(vertices), point=point):
+                    if brute_location(vertices, point)[0]:
+                        self.assertIsNone(tangents)
+                        continue
+                    first, second = tangents
+                    self.assertIn(first, vertices)
+                    self.assertIn(second, vertices)
+                    # the whole hull to the right of point -> first, to the left of point -> second
+                    self.assertTrue(all(exact_turn(point, first, vertex) <= 0 for vertex in vertices))
+                    self.assertTrue(all(exact_turn(point, second, vertex) >= 0 for vertex in vertices))
+
+
+# Split the points into k shards of random sizes, in random order
+def shards(xs, ys, k, rng):
+    order = list(range(len(xs)))
+    rng.shuffle(order)
+    cuts = sorted(rng.randint(0, len(xs)) for i in range(k - 1))
+    bounds = [0] + cuts + [len(xs)]
+    return [([xs[i] for i in order[a:b]], [ys[i] for i in order[a:b]])
+            for a, b in zip(bounds, bounds[1:]) if b > a]
+
+
+class UnionTest(unittest.TestCase):
+
+    def test_union_hulls(self):
+        rng = random.Random(SEED)
+        for name, (xs, ys) in inputs()[:40]:
+            expected = [(xs[i], ys[i]) for i in reference_hull(xs, ys)]
+            for k in (1, 2, 3, 8):
+                with self.subTest(input=name, shards=k):
+                    hulls = [sorted_vertices([(x[i], y[i]) for i in reference_hull(x, y)])
+                             for x, y in shards(xs, ys, k, rng)]
+                    self.assertEqual(clockwise_vertices(union_hulls(hulls)), expected)
+
+    # summaries merged in random groupings, as a reduce tree of any shape would
+    def test_merge_summaries(self):
+        rng = random.Random(SEED)
+        for name, (xs, ys) in inputs()[:40]:
+            expected = [(xs[i], ys[i]) for i in reference_hull(xs, ys)]
+            for cull in (False, True):
+                with self.subTest(input=name, cull=cull):
+                    summaries = [hull_summary(x, y, cull=cull) for x, y in shards(xs, ys, 6, rng)]
+                    while len(summaries) > 1:
+                        rng.shuffle(summaries)
+                        size = rng.randint(2, len(summaries))
+                        summaries = [merge_summaries(summaries[:size])] + summaries[size:]
+                    self.assertEqual(unpack_hull(summaries[0]), expected)
+
+    def test_pack_round_trip(self):
+        for vertices in sample_hulls():
+            with self.subTest(vertices=len(vertices)):
+                self.assertEqual(unpack_hull(pack_hull(vertices)), vertices)
+                self.assertEqual(clockwise_vertices(sorted_vertices(vertices)), vertices)
+        with self.assertRaises(ValueError):
+            unpack_hull(pack_hull([(1.0, 2.0)])[:-1])
+
+
+# Frames of points moving a little: small random steps, a frame where
+# nothing moves, and a frame that snaps them onto a grid, so that equal
+# x-values, equal points and collinear runs appear mid-stream
+def moving_frames(rng, n, count):
+    xs = [rng.random() for i in range(n)]
+    ys = [rng.random() for i in range(n)]
+    frames = []
+    for frame in range(count):
+        if frame == count // 2:
+            xs = [round(x * 8) / 8 for x in xs]
+            ys = [round(y * 8) / 8 for y in ys]
+        elif frame % 3 != 1:
+            xs = [x + rng.gauss(0, 0.002) for x in xs]
+            ys = [y + rng.gauss(0, 0.002) for y in ys]
+        frames.append((xs, ys))
+    return frames
+
+
+class WarmHullTest(unittest.TestCase):
+
+    def test_frames(self):
+        rng = random.Random(SEED)
+        frames = moving_frames(rng, 1500, 12)
+        expected = [reference_hull(xs, ys) for xs, ys in frames]
+        for engine in ENGINES:
+            for cull in (False, True):
+                warm = WarmHull(engine, cull=cull)
+                for frame, (xs, ys) in enumerate(frames):
+                    with self.subTest(engine=engine, cull=cull, frame=frame):
+                        self.assertEqual(warm.update(xs, ys), expected[frame])
+                stats = warm.stats()
+                self.assertEqual((stats.frames, stats.warm_frames, stats.rebuilds), (12, 11, 1))
+
+    # a new number of points, a reset or a degenerate hull means a rebuild
+    def test_rebuilds(self):
+        rng = random.Random(SEED)
+        warm = WarmHull()
+        for n in (50, 50, 80):
+            xs = [rng.random() for i in range(n)]
+            ys = [rng.random() for i in range(n)]
+            self.assertEqual(warm.update(xs, ys), reference_hull(xs, ys))
+        warm.reset()
+        xs, ys = grid(1, 1.0)
+        self.assertEqual(warm.update(xs, ys), [0])
+        xs = [0.0, 1.0, 2.0]
+        ys = [0.0, 1.0, 2.0]
+        self.assertEqual(warm.update(xs, ys), [0, 2])
+        self.assertEqual(warm.update(xs, ys), [0, 2])
+        self.assertEqual(warm.stats(), (6, 1, 5, 3))
+
+
+# distance from point to the polygon given by its vertices, 0 inside or on
+# it (HullIndex.contains, checked above)
+def polygon_distance(vertices, point):
+    if HullIndex(vertices).contains(*point):
+        return 0.0
+    px, py = point
+    best = math.inf
+    for (ax, ay), (bx, by) in zip(vertices, vertices[1:] + vertices[:1]):
+        dx = bx - ax
+        dy = by - ay
+        length = dx * dx + dy * dy
+        t = 0.0 if length == 0 else min(1.0, max(0.0, ((px - ax) * dx + (py - ay) * dy) / length))
+        best = min(best, math.hypot(px - ax - t * dx, py - ay - t * dy))
+    return best
+
+
+class ApproximateHullTest(unittest.TestCase):
+
+    def test_directions(self):
+        for tolerance in (0.5, 0.1, 0.01, 1e-3, 1e-5):
+            k = directions_for(tolerance)
+            with self.subTest(tolerance=tolerance):
+                self.assertEqual(k % 4, 0)
+                self.assertLessEqual(math.tan(math.pi / k) / 2, tolerance)
+                if k > 4:
+                    self.assertGreater(math.tan(math.pi / (k - 4)) / 2, tolerance)
+        with self.assertRaises(ValueError):
+            directions_for(0)
+
+    # every vertex of the true hull lies within the error bound of the
+    # approximation, whose vertices are input points
+    def test_error_bound(self):
+        rng = random.Random(SEED)
+        cases = [case for case in inputs() if len(case[1][0]) > 2][:30]
+        cases.append(('far', ([rng.gauss(0, 1e6) for i in range(5000)], [rng.gauss(0, 1) for i in range(5000)])))
+        for name, (xs, ys) in cases:
+            exact = [(xs[i], ys[i]) for i in reference_hull(xs, ys)]
+            width = max(xs) - min(xs)
+            height = max(ys) - min(ys)
+            for tolerance in (0.2, 0.01, 1e-4):
+                result = approximate_hull(xs, ys, tolerance)
+                with self.subTest(input=name, tolerance=tolerance):
+                    self.assertEqual(result.points, len(xs))
+                    self.assertLessEqual(len(result.vertices), result.directions)
+                    self.assertEqual(result.vertices, [(xs[i], ys[i]) for i in result.indices])
+                    self.assertLessEqual(result.error_bound, tolerance * math.hypot(width, height) * (1 + 1e-12))
+                    worst = max(polygon_distance(result.vertices, point) for point in exact)
+                    self.assertLessEqual(worst, result.error_bound * (1 + 1e-9))
+
+    # The worst case of direction sampling: a vertex so shallow that its
+    # outward normals all fall between two sampled directions, half way.  It
+    # is missed, and the error comes within 1% of the bound.
+    def test_tight_bound(self):
+        for tolerance in (0.2, 0.01, 1e-4):
+            k = directions_for(tolerance)
+            height = 0.99 * math.tan(math.pi / k)
+            turn = math.pi / k
+            triangle = [(-1.0, 0.0), (1.0, 0.0), (0.0, height)]
+            xs = [x * math.cos(turn) - y * math.sin(turn) for x, y in triangle]
+            ys = [x * math.sin(turn) + y * math.cos(turn) for x, y in triangle]
+            result = approximate_hull(xs, ys, tolerance)
+            with self.subTest(tolerance=tolerance):
+                self.assertEqual(sorted(result.indices), [0, 1])
+                error = polygon_distance(result.vertices, (xs[2], ys[2]))
+                self.assertLessEqual(error, result.error_bound)
+                self.assertGreater(error, 0.98 * result.error_bound)
+
+    # feeding the points in pieces is the same as feeding them at once
+    def test_streaming(self):
+        rng = random.Random(SEED)
+        xs = [rng.gauss(0, 1) for i in range(3000)]
+        ys = [rng.gauss(0, 1) for i in range(3000)]
+        whole = approximate_hull(xs, ys, 0.01)
+        streamed = ApproximateHull(0.01)
+        start = 0
+        while start < len(xs):
+            end = start + rng.randint(1, 700)
+            streamed.add(xs[start:end], ys[start:end])
+            start = end
+        self.assertEqual(streamed.result(), whole)
+        self.assertEqual(ApproximateHull(0.01).result().vertices, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+from collections import namedtuple
+
+import numpy as np
+
+from engines import ENGINES
+from hull_query import HullIndex
+
+#
+# Re-hulling a point set whose points move a little between frames.
+#
+# WarmHull keeps two things from the previous frame: the order that sorted the
+# points by x, and the hull.  A new frame starts from both.
+#   - The previous hull vertices, at their new positions, span a convex
+#     polygon inside the new hull.  Every point strictly inside it can't be a
+#     vertex, and when points move little that is nearly every point.
+#   - The previous x-order is nearly sorted for the new coordinates, and a
+#     stable NumPy sort (timsort) on nearly sorted keys is mostly one pass
+#     over long runs.  It costs a fraction of a fresh sort.
+# The remaining candidates come out of the new order already sorted and go
+# straight to the engine's merge recursion.
+#
+# A frame is a full rebuild, the same solve compute_hull does, when there is
+# nothing to start from: the first frame, after the number of points changes,
+# or when the previous hull had fewer than 3 vertices.
+#
+
+# frames updated in all, how many of them started from the previous frame
+# and how many were full rebuilds, and the number of candidates the last
+# frame passed to the engine
+WarmStats = namedtuple('WarmStats', 'frames warm_frames rebuilds candidates')
+
+
+class WarmHull:
+
+    # engine is one of engines.ENGINES; workers and cull are used for rebuilds
+    def __init__(self, engine='divide', workers=1, cull=False):
+        self.engine = ENGINES[engine]
+        self.workers = workers
+        self.cull = cull
+        # indices of all the points sorted by x as of the last frame
+        self.order = None
+        # hull indices of the last frame
+        self.hull = None
+        self.frames = 0
+        self.warm_frames = 0
+        self.rebuilds = 0
+        self.candidates = 0
+
+    # Hull the points at their new coordinates; point i must be the same
+    # object in every frame.  xs and ys may be lists or NumPy arrays.
+    # returns the indices of the hull vertices in clockwise order, starting at
+    # the leftmost point, as the engines do
+    def update(self, xs, ys):
+        xs = np.asarray(xs, dtype=np.float64)
+        ys = np.asarray(ys, dtype=np.float64)
+        if len(xs) != len(ys):
+            raise ValueError('xs and ys must have the same length')
+        self.frames += 1
+        if self.order is None or len(self.order) != len(xs) or len(self.hull) < 3:
+            self.hull = self.rebuild(xs, ys)
+        else:
+            self.hull = self.warm_update(xs, ys)
+        return list(self.hull)
+
+    # Forget the previous frame, so that the next update is a rebuild
+    def reset(self):
+        self.order = None
+        self.hull = None
+
+    def stats(self):
+        return WarmStats(self.frames, self.warm_frames, self.rebuilds, self.candidates)
+
+    def rebuild(self, xs, ys):
+        self.rebuilds += 1
+        self.candidates = len(xs)
+        self.order = np.argsort(xs, kind='stable')
+        return self.engine(xs.tolist(), ys.tolist()).compute(self.workers, self.cull)
+
+    def warm_update(self, xs, ys):
+        self.warm_frames += 1
+        # the previous hull vertices may have moved out of convex position, so
+        # hull them again; that's h points, and a polygon inside the new hull
+        previous = self.hull
+        inner = self.engine(xs[previous].tolist(), ys[previous].tolist()).compute()
+        inner = [previous[i] for i in inner]
+
+        order = self.order
+        sorted_xs = xs[order]
+        moved = np.argsort(sorted_xs, kind='stable')
+        order = order[moved]
+        sorted_xs = sorted_xs[moved]
+        self.order = order
+
+        candidates = order
+        if len(inner) >= 3:
+            # queries in x-order make the index's searchsorted much faster
+            index = HullIndex.from_engine(xs, ys, inner)
+            candidates = order[~index.contains_many(sorted_xs, ys[order], strict=True)]
+        self.candidates = len(candidates)
+
+        candidate_xs = xs[candidates]
+        if np.any(candidate_xs[1:] == candidate_xs[:-1]):
+            # equal x-values: the engine's sort decides which of any equal
+            # points is kept, and it keeps the first in index order
+            candidates = np.sort(candidates)
+            hull = self.engine(xs[candidates].tolist(), ys[candidates].tolist()).compute()
+        else:
+            engine = self.engine(candidate_xs.tolist(), ys[candidates].tolist())
+            hull, rightmost = engine.convex_hull_solver(list(range(len(candidates))))
+        return candidates[hull].tolist()
@@ -0,0 +1,88 @@
+import time
+
+from hull_union import combine_hulls, clockwise_vertices
+
+#
+# Hull of a sliding window over a point stream: the last W points and/or the
+# points from the last T seconds.
+#
+# The window is a queue built from two stacks.  New points go on the back
+# stack, which keeps one running hull of everything on it.  Expiring takes from
+# the front stack, where every entry stores the hull of itself and everything
+# newer on that stack; when the front runs dry the back stack is moved over
+# and those hulls rebuilt.  The current hull is the combination of the front
+# top's hull and the back hull.  Each point is moved once, so appends and
+# expiries cost amortized O(h) combine work.
+#
+# The window hulls overlap, so the combine step cannot be merge_two_hulls
+# (which needs x-separated hulls); it is hull_union.combine_hulls instead.
+#
+
+
+class SlidingWindowHull:
+
+    # max_points keeps only the newest max_points points, max_age only the
+    # points appended within the last max_age seconds of clock().  Either or
+    # both can be given.
+    def __init__(self, max_points=None, max_age=None, clock=time.monotonic):
+        self.max_points = max_points
+        self.max_age = max_age
+        self.clock = clock
+        # entries are (timestamp, point, hull of this and all newer front entries)
+        self.front = []
+        # entries are (timestamp, point), back_hull covers all of them
+        self.back = []
+        self.back_hull = []
+
+    def __len__(self):
+        return len(self.front) + len(self.back)
+
+    # add a point, then drop whatever falls out of the window
+    def append(self, x, y, timestamp=None):
+        if timestamp is None:
+            timestamp = self.clock()
+        point = (x, y)
+        self.back.append((timestamp, point))
+        self.back_hull = combine_hulls(self.back_hull, [point])
+
+        if self.max_points is not None:
+            while len(self) > self.max_points:
+                self.popleft()
+        self.expire(timestamp)
+
+    # drop the points older than max_age as of now (default clock())
+    def expire(self, now=None):
+        if self.max_age is None:
+            return
+        if now is None:
+            now = self.clock()
+        while len(self) and self.oldest_timestamp() < now - self.max_age:
+            self.popleft()
+
+    def oldest_timestamp(self):
+        if not self.front:
+            self.transfer()
+        return self.front[-1][0]
+
+    # drop the oldest point in the window
+    def popleft(self):
+        if not self.front:
+            self.transfer()
+        self.front.pop()
+
+    # move the back stack onto the front, newest first, rebuilding the
+    # front hulls on the way
+    def transfer(self):
+        if not self.back:
+            raise IndexError('popleft from an empty window')
+        hull = []
+        while self.back:
+            timestamp, point = self.back.pop()
+            hull = combine_hulls(hull, [point])
+            self.front.append((timestamp, point, hull))
+        self.back_hull = []
+
+    # current hull vertices, clockwise starting at the leftmost point
+    def vertices(self):
+        front_hull = self.front[-1][2] if self.front else []
+        return clockwise_vertices(combine_hulls(front_hull, self.back_hull))